@@ -9,12 +9,11 @@ import sys
 import json
 import logging
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, flash, stream_with_context
 from werkzeug.utils import secure_filename
 import time
 from dotenv import load_dotenv
 from datetime import timedelta
-import openai
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -146,6 +145,41 @@ def search():
         logger.error(f"Search failed: {e}")
         return jsonify({'error': f'Search failed: {str(e)}'}), 500
 
+@app.route('/search/stream')
+def search_stream():
+    """Progressive search as server-sent events: 'ranked' with the local ranking, 'validated' with the OpenAI rerank, then 'done'."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    if not init_search_engine():
+        return jsonify({'error': 'Search engine not available'}), 500
+    
+    query = request.args.get('query', '').strip()
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    top_k = request.args.get('top_k', 5, type=int)
+    
+    def generate():
+        logger.info(f"Streaming search for: {query}")
+        try:
+            for event in search_engine.search_progressive(query, top_k=top_k):
+                payload = {
+                    'success': True,
+                    'phase': event['phase'],
+                    'results': event['results'],
+                    'query': query,
+                    'count': len(event['results']),
+                    'elapsed_ms': round(event['elapsed'] * 1000, 1)
+                }
+                yield f"event: {event['phase']}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            logger.error(f"Streaming search failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': f'Search failed: {str(e)}'})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Upload and index a single file."""
@@ -339,7 +373,11 @@ def status():
             'total_screenshots': total_screenshots,
             'openai_available': openai_available,
             'index_file_exists': search_engine.index_file.exists() if search_engine else False,
-            'embeddings_file_exists': search_engine.embeddings_file.exists() if search_engine else False
+            'embeddings_file_exists': search_engine.embeddings_file.exists() if search_engine else False,
+            'query_cache': search_engine.query_cache.stats(),
+            'validation_cache': search_engine.validation_cache.stats(),
+            'models_loaded': search_engine.loaded_models(),
+            'search_latency': search_engine.profiler.snapshot()
         })
         
     except Exception as e:
@@ -442,6 +480,7 @@ def test_openai_key():
         # Create httpx client without proxies to avoid configuration issues
         import httpx
         http_client = httpx.Client()
+        import openai  # Deferred so the web UI starts without importing the OpenAI SDK
         client = openai.OpenAI(api_key=api_key, http_client=http_client)
         
         # Make a simple test call
@@ -485,6 +524,7 @@ def save_openai_key():
             # Create httpx client without proxies to avoid configuration issues
             import httpx
             http_client = httpx.Client()
+            import openai
             search_engine.openai_client = openai.OpenAI(api_key=api_key, http_client=http_client)
             search_engine.use_openai = True
         
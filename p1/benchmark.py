@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Scaling Benchmark for Visual Memory Search
+Builds synthetic corpora from the generate_test_dataset.py templates and measures index build
+throughput, load time, query latency percentiles and peak RSS for each search mode.
+
+    python benchmark.py                                  # 1k, 10k and 100k entries
+    python benchmark.py --sizes 1000 10000 --output bench.json
+    python benchmark.py --compare baseline.json          # Ratios against an earlier run
+
+Every build and every search mode runs in a fresh interpreter so peak RSS is per measurement.
+Embeddings come from a deterministic hashing encoder, so no model download is needed.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+SEARCH_MODES = {
+    'exact': {'ann': False, 'ann_index_type': 'flat'},
+    'ann-flat': {'ann': True, 'ann_index_type': 'flat'},
+    'ann-ivf': {'ann': True, 'ann_index_type': 'ivf'},
+    'ann-hnsw': {'ann': True, 'ann_index_type': 'hnsw'},
+    'exact-batch': {'ann': False, 'ann_index_type': 'flat', 'batch': True},  # search_many over the whole query set
+    'two-stage': {'ann': False, 'ann_index_type': 'flat', 'candidate_pool': 200}  # Boosts only the top 200 dense matches
+}
+QUERY_ROUNDS = 5  # Passes over the query set per mode
+SYNTHETIC_EMBEDDING_DIM = 384  # Same width as all-MiniLM-L6-v2
+DESCRIPTION_DETAILS = ['blue button', 'white background', 'dark theme', 'navigation menu', 'sidebar', 'header',
+                       'input field', 'card layout', 'modal dialog', 'data table', 'green accent', 'red alert']
+
+class SyntheticEmbeddingModel:
+    """Deterministic bag-of-words hashing encoder with the SentenceTransformer.encode surface.
+
+    Texts sharing words get similar vectors, so queries rank template matches first.
+    """
+
+    def __init__(self, dimension: int = SYNTHETIC_EMBEDDING_DIM):
+        self.dimension = dimension
+        self._word_vectors = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int(hashlib.sha1(word.encode('utf-8')).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            self._word_vectors[word] = vector
+        return vector
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9]+", text.lower()):
+                embeddings[i] += self._word_vector(word)
+        return embeddings
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def template_profiles() -> list:
+    """Render each dataset template once: its drawn text, description, size and detector output."""
+    from PIL import ImageDraw
+    from generate_test_dataset import SCREENSHOT_TEMPLATES
+    from main import VisualMemorySearch, ImageFrame
+    import io
+
+    detector = VisualMemorySearch.__new__(VisualMemorySearch)
+    detector.analysis_scale = 1.0
+    original_text = ImageDraw.ImageDraw.text
+    profiles = []
+    for filename, create_func, description in SCREENSHOT_TEMPLATES:
+        drawn = []
+        # Capture the strings each template draws; they stand in for OCR output
+        ImageDraw.ImageDraw.text = lambda self, xy, text, *args, **kwargs: (drawn.append(str(text)),
+                                                                             original_text(self, xy, text, *args, **kwargs))[1]
+        try:
+            image = create_func()
+        finally:
+            ImageDraw.ImageDraw.text = original_text
+
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        blue_info = detector._detect_blue_buttons_enhanced(ImageFrame(filename, buffer.getvalue()))
+        profiles.append({
+            'stem': Path(filename).stem,
+            'description': description,
+            'words': " ".join(drawn).split(),
+            'dimensions': tuple(image.size),
+            'file_size': len(buffer.getvalue()),
+            'blue_info': blue_info
+        })
+    return profiles
+
+def synthetic_records(size: int, corpus_dir: Path, seed: int = 0) -> list:
+    """Index records for `size` screenshots cycling through the templates with varied text."""
+    rng = random.Random(seed)
+    profiles = template_profiles()
+    records = []
+    for i in range(size):
+        profile = profiles[i % len(profiles)]
+        words = profile['words'][:]
+        rng.shuffle(words)
+        blue_info = profile['blue_info']
+        records.append({
+            "file_path": str(corpus_dir / f"{profile['stem']}_{i:06d}.png"),
+            "filename": f"{profile['stem']}_{i:06d}.png",
+            "ocr_text": " ".join(words[:max(5, int(len(words) * rng.uniform(0.5, 1.0)))]),
+            "visual_description": f"{profile['description']} with {', '.join(rng.sample(DESCRIPTION_DETAILS, 3))}",
+            "file_size": profile['file_size'],
+            "dimensions": profile['dimensions'],
+            "blue_button_detected": blue_info['detected'],
+            "blue_button_count": blue_info['count'],
+            "blue_button_details": blue_info['details'],
+            "blue_percentage": blue_info.get('blue_percentage', 0.0),
+            "color_histogram": blue_info.get('color_histogram', []),
+            "content_hash": None
+        })
+    return records
+
+def quiet_logging():
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+def run_build(corpus_dir: Path, size: int) -> dict:
+    """Build and save the index for a synthetic corpus of `size` entries."""
+    from main import VisualMemorySearch
+    quiet_logging()
+
+    start = time.perf_counter()
+    records = synthetic_records(size, corpus_dir)
+    synthesis_s = time.perf_counter() - start
+
+    engine = VisualMemorySearch(str(corpus_dir), enable_openai=False)
+    engine.embedding_model = SyntheticEmbeddingModel()
+    engine.screenshots_data = records
+
+    start = time.perf_counter()
+    engine._build_search_index()
+    engine._save_index()
+    build_s = time.perf_counter() - start
+
+    index_bytes = sum(f.stat().st_size for f in corpus_dir.iterdir() if f.is_file())
+    return {
+        'entries': size,
+        'synthesis_s': round(synthesis_s, 3),
+        'build_s': round(build_s, 3),
+        'entries_per_s': round(size / build_s, 1),
+        'index_mb': round(index_bytes / (1024 * 1024), 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+def run_mode(corpus_dir: Path, mode: str, rounds: int) -> dict:
+    """Load the index and time every test query `rounds` times in one search mode."""
+    from main import VisualMemorySearch
+    from generate_test_dataset import TEST_QUERIES
+    quiet_logging()
+    settings = SEARCH_MODES[mode]
+
+    start = time.perf_counter()
+    engine = VisualMemorySearch(str(corpus_dir), ann_index_type=settings['ann_index_type'],
+                                query_cache_size=0, enable_openai=False, candidate_pool=settings.get('candidate_pool', 0))
+    load_s = time.perf_counter() - start
+    engine.embedding_model = SyntheticEmbeddingModel()
+
+    ann_prepare_s = None
+    if settings['ann']:
+        # Loads the persisted FAISS index, or builds and saves it on the first run of this variant
+        start = time.perf_counter()
+        engine._load_ann_index()
+        ann_prepare_s = round(time.perf_counter() - start, 3)
+        if engine.ann_index is None:
+            return {'error': f"{settings['ann_index_type']} ANN index unavailable (is faiss installed?)"}
+
+    start = time.perf_counter()
+    engine.search(TEST_QUERIES[0], top_k=5, ann=settings['ann'])
+    first_query_ms = (time.perf_counter() - start) * 1000
+
+    # Untimed warm-up pass through the same call path as the timed rounds
+    if settings.get('batch'):
+        engine.search_many(TEST_QUERIES, top_k=5, ann=settings['ann'])
+    else:
+        for query in TEST_QUERIES:
+            engine.search(query, top_k=5, ann=settings['ann'])
+    engine.profiler.reset()
+
+    latencies = []
+    for _ in range(rounds):
+        if settings.get('batch'):
+            # One search_many call per round; each query is charged the amortized batch time
+            start = time.perf_counter()
+            engine.search_many(TEST_QUERIES, top_k=5, ann=settings['ann'])
+            latencies.extend([(time.perf_counter() - start) * 1000 / len(TEST_QUERIES)] * len(TEST_QUERIES))
+            continue
+        for query in TEST_QUERIES:
+            start = time.perf_counter()
+            engine.search(query, top_k=5, ann=settings['ann'])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies = np.array(latencies)
+    return {
+        'load_s': round(load_s, 3),
+        'ann_prepare_s': ann_prepare_s,
+        'first_query_ms': round(first_query_ms, 3),
+        'queries': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'qps': round(1000 / float(latencies.mean()), 1),
+        'stages': engine.profiler.snapshot(),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+def run_subprocess(*args) -> dict:
+    """Run this script in worker mode and parse the JSON it prints last."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), *args],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        return {'error': (result.stderr.strip().splitlines() or ['worker failed'])[-1]}
+    return json.loads(lines[-1])
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def run_benchmark(sizes, modes, rounds, workdir=None) -> dict:
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'query_rounds': rounds
+        },
+        'results': {}
+    }
+
+    for size in sizes:
+        corpus_dir = Path(workdir or tempfile.mkdtemp(prefix='vms_bench_')) / f"corpus_{size}"
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        print(f"🏗️  {size:,} entries: building index in {corpus_dir}...")
+        entry = {'build': run_subprocess('--worker', 'build', '--corpus', str(corpus_dir), '--size', str(size)), 'modes': {}}
+        if 'error' in entry['build']:
+            print(f"   ❌ Build failed: {entry['build']['error']}")
+        else:
+            print(f"   ✅ {entry['build']['build_s']:.2f}s ({entry['build']['entries_per_s']:,.0f} entries/s), "
+                  f"peak RSS {entry['build']['peak_rss_mb']:.0f} MB")
+            for mode in modes:
+                stats = run_subprocess('--worker', 'mode', '--corpus', str(corpus_dir), '--mode', mode, '--rounds', str(rounds))
+                entry['modes'][mode] = stats
+                if 'error' in stats:
+                    print(f"   ⚠️  {mode:<11} {stats['error']}")
+                else:
+                    print(f"   🔍 {mode:<11} load {stats['load_s']:.2f}s  p50 {stats['p50_ms']:.2f} ms  "
+                          f"p99 {stats['p99_ms']:.2f} ms  {stats['qps']:.0f} q/s  peak RSS {stats['peak_rss_mb']:.0f} MB")
+        speedup = batch_speedup(entry)
+        if speedup is not None:
+            entry['batch_speedup'] = speedup
+            print(f"   📦 search_many throughput x{speedup:.2f} vs one search() per query")
+        report['results'][str(size)] = entry
+    return report
+
+def batch_speedup(entry: dict):
+    """Mean per-query latency of exact search() over exact-batch search_many(), when both ran."""
+    single, batch = entry['modes'].get('exact'), entry['modes'].get('exact-batch')
+    if not single or not batch or 'error' in single or 'error' in batch:
+        return None
+    return round(single['mean_ms'] / batch['mean_ms'], 2)
+
+def compare(report: dict, baseline: dict):
+    """Print current/baseline ratios for build throughput and query latency (lower latency ratio is better)."""
+    print(f"\n📊 Compared with {baseline['meta'].get('commit', 'unknown')[:10]}:")
+    for size, entry in report['results'].items():
+        base = baseline.get('results', {}).get(size)
+        if not base or 'error' in entry['build'] or 'error' in base['build']:
+            continue
+        print(f"  {int(size):,} entries: build throughput x{entry['build']['entries_per_s'] / base['build']['entries_per_s']:.2f}")
+        if entry.get('batch_speedup') is not None:
+            print(f"    search_many speedup x{entry['batch_speedup']:.2f} (baseline: "
+                  f"{'x%.2f' % base['batch_speedup'] if base.get('batch_speedup') is not None else 'n/a'})")
+        for mode, stats in entry['modes'].items():
+            base_stats = base['modes'].get(mode)
+            if 'error' in stats or not base_stats or 'error' in base_stats:
+                continue
+            print(f"    {mode:<11} p50 x{stats['p50_ms'] / base_stats['p50_ms']:.2f}  p99 x{stats['p99_ms'] / base_stats['p99_ms']:.2f}  "
+                  f"peak RSS x{stats['peak_rss_mb'] / base_stats['peak_rss_mb']:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark for index build and search")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="Corpus sizes (default: 1000 10000 100000)")
+    parser.add_argument("--modes", nargs='+', choices=list(SEARCH_MODES), default=list(SEARCH_MODES), help="Search modes (default: all)")
+    parser.add_argument("--rounds", type=int, default=QUERY_ROUNDS, help=f"Passes over the query set per mode (default: {QUERY_ROUNDS})")
+    parser.add_argument("--output", "-o", default="benchmark_results.json", help="JSON results file (default: benchmark_results.json)")
+    parser.add_argument("--workdir", help="Directory for the corpora (default: a new temporary directory)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", choices=['build', 'mode'], help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=list(SEARCH_MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == 'build':
+        print(json.dumps(run_build(Path(args.corpus), args.size)))
+        return
+    if args.worker == 'mode':
+        print(json.dumps(run_mode(Path(args.corpus), args.mode, args.rounds)))
+        return
+
+    report = run_benchmark(args.sizes, args.modes, args.rounds, args.workdir)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for Visual Memory Search
+Fails if `import main` takes longer than main.IMPORT_TIME_BUDGET, listing the slowest imports
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['cv2', 'torch', 'transformers', 'sentence_transformers', 'faiss', 'sklearn', 'openai', 'pytesseract']
+
+def measure_import(module="main", runs=3):
+    """Best-of-N cumulative import time of module in a fresh interpreter, plus per-module timings."""
+    best = None
+    timings = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(result.stderr)
+            sys.exit(1)
+
+        run_timings = {}
+        for line in result.stderr.splitlines():
+            match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)", line)
+            if match:
+                run_timings[match.group(4)] = int(match.group(2)) / 1e6  # Cumulative microseconds
+        total = run_timings.get(module, 0.0)
+        if best is None or total < best:
+            best, timings = total, run_timings
+    return best, timings
+
+def main():
+    from main import IMPORT_TIME_BUDGET
+
+    total, timings = measure_import()
+    print(f"⏱️  import main: {total * 1000:.0f} ms (budget {IMPORT_TIME_BUDGET * 1000:.0f} ms)")
+
+    slowest = sorted(((t, name) for name, t in timings.items() if '.' not in name and name != 'main'), reverse=True)[:8]
+    for seconds, name in slowest:
+        print(f"  {name:<30} {seconds * 1000:7.1f} ms")
+
+    loaded_heavy = [name for name in HEAVY_MODULES if name in timings]
+    if loaded_heavy:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(loaded_heavy)}")
+        sys.exit(1)
+    if total > IMPORT_TIME_BUDGET:
+        print("❌ Import time over budget")
+        sys.exit(1)
+    print("✅ Import time within budget")
+
+if __name__ == "__main__":
+    main()
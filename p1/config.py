@@ -40,7 +40,7 @@ LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
 # File Paths
-DEFAULT_INDEX_FILE = "search_index.json"
+DEFAULT_INDEX_FILE = "search_index.vmsi"
 DEFAULT_EMBEDDINGS_FILE = "embeddings.npy"
 
 def get_openai_config():
@@ -677,6 +677,27 @@ def create_weather_app():
     
     return img
 
+# (filename, generator, description) for every screenshot in the test dataset
+SCREENSHOT_TEMPLATES = [
+    ("error_auth.png", create_error_screenshot, "Authentication error page"),
+    ("login_form.png", create_login_form, "Login form"),
+    ("dashboard_charts.png", create_dashboard, "Dashboard with charts"),
+    ("mobile_app.png", create_mobile_app, "Mobile app interface"),
+    ("404_page.png", create_404_page, "404 error page"),
+    ("user_profile.png", create_user_profile, "User profile page"),
+    ("ecommerce_product.png", create_ecommerce_product, "E-commerce product page"),
+    ("social_media_feed.png", create_social_media_feed, "Social media news feed"),
+    ("gaming_interface.png", create_gaming_interface, "Gaming interface"),
+    ("email_client.png", create_email_client, "Email client interface"),
+    ("weather_app.png", create_weather_app, "Weather app interface")
+]
+
+# Queries suggested after generation; they exercise every template
+TEST_QUERIES = [
+    'blue button', 'login form', 'chart', 'mobile app', 'dark theme', 'error page',
+    'user profile', 'shopping cart', 'social media', 'gaming', 'email', 'weather'
+]
+
 def generate_all_screenshots():
     """Generate all test screenshots and return count of successful generations."""
     try:
@@ -684,19 +705,7 @@ def generate_all_screenshots():
         os.makedirs("test_screenshots", exist_ok=True)
         
         # Define all screenshots to generate
-        screenshots = [
-            ("error_auth.png", create_error_screenshot, "Authentication error page"),
-            ("login_form.png", create_login_form, "Login form"),
-            ("dashboard_charts.png", create_dashboard, "Dashboard with charts"),
-            ("mobile_app.png", create_mobile_app, "Mobile app interface"),
-            ("404_page.png", create_404_page, "404 error page"),
-            ("user_profile.png", create_user_profile, "User profile page"),
-            ("ecommerce_product.png", create_ecommerce_product, "E-commerce product page"),
-            ("social_media_feed.png", create_social_media_feed, "Social media news feed"),
-            ("gaming_interface.png", create_gaming_interface, "Gaming interface"),
-            ("email_client.png", create_email_client, "Email client interface"),
-            ("weather_app.png", create_weather_app, "Weather app interface")
-        ]
+        screenshots = SCREENSHOT_TEMPLATES
         
         print("🎨 Generating test dataset...")
         print(f"📁 Output directory: {os.path.abspath('test_screenshots')}")
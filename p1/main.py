@@ -4,87 +4,1428 @@ Project 1: Visual Memory Search
 A tool to search screenshot history using natural language queries for both text and visual content.
 """
 
+import io
 import os
+import re
 import sys
 import json
+import math
+import mmap
+import struct
+import time
+import heapq
+import hashlib
 import argparse
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator
 import logging
 import numpy as np
-import cv2
-from PIL import Image
-import pytesseract
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from collections.abc import MutableMapping
 import base64
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import pipeline
-import openai
 from dotenv import load_dotenv
 
-# Import required packages
-try:
-    import cv2
-    import numpy as np
-    from PIL import Image
-    import pytesseract
-    from transformers import pipeline
-    import torch
-    from sentence_transformers import SentenceTransformer
-    import faiss
-    from sklearn.metrics.pairwise import cosine_similarity
-    import openai
-except ImportError as e:
-    print(f"Missing required package: {e}")
-    print("Please install required packages: pip install opencv-python pillow pytesseract transformers torch sentence-transformers faiss-cpu scikit-learn openai")
-    sys.exit(1)
+INSTALL_HINT = "pip install opencv-python pillow pytesseract transformers torch sentence-transformers faiss-cpu openai"
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access.
+    
+    Heavy dependencies (OpenCV, FAISS, transformers, OpenAI) are only needed by indexing and
+    search code paths, so metadata-only commands never pay their import time.
+    """
+    
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._name)
+            except ImportError as e:
+                raise ImportError(f"Missing required package: {e}. Please install required packages: {INSTALL_HINT}") from e
+        return getattr(self._module, attribute)
+
+# Imported on first use
+cv2 = LazyModule('cv2')
+Image = LazyModule('PIL.Image')
+pytesseract = LazyModule('pytesseract')
+faiss = LazyModule('faiss')
+openai = LazyModule('openai')
+sentence_transformers = LazyModule('sentence_transformers')
+transformers = LazyModule('transformers')
+
+# Wall-clock budget for `import main`, checked by check_import_time.py
+IMPORT_TIME_BUDGET = 0.5  # Seconds
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Approximate nearest-neighbour index variants (FAISS)
+ANN_INDEX_TYPES = ('flat', 'ivf', 'hnsw')
+ANN_HNSW_M = 32  # Graph neighbours per node
+ANN_HNSW_EF_SEARCH = 64  # Search-time breadth for HNSW
+ANN_IVF_NPROBE = 8  # Inverted lists visited per IVF query
+ANN_MIN_CANDIDATES = 50  # Minimum neighbours fetched before boosting
+ANN_FINGERPRINT_ROWS = 64  # Embedding rows sampled into the fingerprint saved with each FAISS file
+CANDIDATE_POOL_SIZE = 200  # Suggested dense candidate pool for two-stage retrieval (--candidate-pool)
+SEARCH_BATCH_QUERIES = 64  # Queries scored per matrix-matrix product in search_many (bounds the N x m score block)
+
+# Incremental index journal
+JOURNAL_MAX_ENTRIES = 500  # Compact into the full index files after this many appends
+
+# Query boost vocabularies, matched against descriptions once at index time
+BOOST_COLORS = ['blue', 'red', 'green', 'yellow', 'purple', 'orange', 'pink', 'brown', 'gray', 'black', 'white']
+COLOR_CONTEXT_TERMS = ['color', 'colored', 'theme', 'background']
+UI_BOOST_ELEMENTS = ['button', 'form', 'input', 'field', 'menu', 'sidebar', 'header', 'navigation', 'modal', 'dialog', 'tooltip']
+LAYOUT_TERMS = ['layout', 'design', 'interface', 'ui', 'ux', 'grid', 'card', 'sidebar', 'header', 'footer']
+STYLE_TERMS = ['modern', 'classic', 'minimal', 'complex', 'simple']
+THEME_TERMS = ['dark', 'light']
+
+SEMANTIC_TAG_CATEGORIES = {
+    'e-commerce': ['shopping', 'cart', 'product', 'store', 'buy', 'purchase'],
+    'social media': ['social', 'post', 'feed', 'profile', 'friend', 'share'],
+    'productivity': ['dashboard', 'analytics', 'chart', 'report', 'data', 'metrics'],
+    'communication': ['email', 'chat', 'message', 'inbox', 'compose'],
+    'gaming': ['game', 'player', 'score', 'level', 'inventory', 'health'],
+    'weather': ['weather', 'temperature', 'forecast', 'climate', 'sunny', 'rainy'],
+    'authentication': ['login', 'signin', 'password', 'auth', 'security'],
+    'error': ['error', '404', 'unauthorized', 'failed', 'warning']
+}
+
+# Synonym groups for OCR matching; a query word belongs to the first group listing it
+SEMANTIC_GROUPS = {
+    'button': ['btn', 'click', 'submit', 'action', 'interactive'],
+    'form': ['input', 'field', 'submit', 'entry', 'data'],
+    'error': ['warning', 'alert', 'problem', 'issue', 'failed'],
+    'login': ['signin', 'authentication', 'auth', 'credentials', 'password'],
+    'dashboard': ['overview', 'summary', 'stats', 'metrics', 'analytics'],
+    'search': ['find', 'lookup', 'query', 'filter', 'discover'],
+    'upload': ['import', 'add', 'attach', 'file', 'document'],
+    'settings': ['config', 'preferences', 'options', 'setup', 'configuration']
+}
+
+# Columns of the per-screenshot feature matrix: "desc:<term>" substring flags on the
+# visual description, "tag:<category>" semantic tags and "ocr:<group>" OCR synonym hits
+FEATURE_DESC_TERMS = list(dict.fromkeys(
+    BOOST_COLORS + THEME_TERMS + COLOR_CONTEXT_TERMS + UI_BOOST_ELEMENTS + LAYOUT_TERMS + STYLE_TERMS
+))
+FEATURE_COLUMNS = (
+    [f"desc:{term}" for term in FEATURE_DESC_TERMS]
+    + [f"tag:{category}" for category in SEMANTIC_TAG_CATEGORIES]
+    + [f"ocr:{group}" for group in SEMANTIC_GROUPS]
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+# Inclusive HSV ranges (OpenCV scale: H 0-179, S/V 0-255); a color's pixels are the union of its ranges.
+# Every percentage is a sum over one quantized histogram whose bin edges are exactly these bounds.
+COLOR_RANGES = {
+    'blue': [
+        ([100, 80, 80], [130, 255, 255]),      # Standard blue
+        ([110, 70, 70], [140, 255, 255]),      # Lighter blue
+        ([90, 90, 90], [120, 255, 255]),       # Darker blue
+        ([100, 60, 60], [130, 255, 200]),      # Desaturated blue
+        ([95, 50, 50], [135, 255, 255]),       # Wider blue range
+        ([105, 40, 40], [125, 255, 180]),      # Lower saturation threshold
+    ],
+    'red': [([0, 80, 80], [10, 255, 255])],
+    'green': [([40, 80, 80], [80, 255, 255])],
+    'yellow': [([20, 80, 80], [40, 255, 255])],
+    'purple': [([130, 80, 80], [160, 255, 255])],
+    'orange': [([10, 80, 80], [20, 255, 255])],
+    'button_blue': [([100, 60, 60], [130, 255, 255])]  # Blue content of button regions
+}
+COLOR_PROFILE_COLORS = ['blue', 'red', 'green', 'yellow', 'purple', 'orange']
+DOMINANT_COLOR_THRESHOLDS = {'blue': 3.0, 'red': 5.0, 'green': 5.0, 'yellow': 5.0, 'purple': 5.0, 'orange': 5.0}
+
+NUMERIC_FEATURE_COLUMNS = (
+    ['blue_button_detected', 'blue_button_count', 'blue_percentage']
+    + [f"color:{color}" for color in COLOR_PROFILE_COLORS]
+)
+
+# BM25 parameters for OCR text
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Parsed queries (enhanced text, semantic context, embedding) kept in memory
+QUERY_CACHE_SIZE = 256
+
+class QueryCache:
+    """Thread-safe bounded LRU cache with hit and miss counters."""
+    
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Cache key for a query: lowercased with whitespace collapsed."""
+        return " ".join(query.lower().split())
+    
+    def get(self, key: str):
+        """Return the cached value for key (marking it most recently used), or None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, value):
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all entries; counters are kept."""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+# Search profiling: per-stage wall time with call counts and a rolling window of recent samples
+PROFILE_WINDOW = 1024
+PROFILE_PERCENTILES = (50, 95, 99)
+
+class SearchProfiler:
+    """Thread-safe per-stage timer for search(); keeps totals, call counts and rolling latency percentiles."""
+    
+    def __init__(self, window: int = PROFILE_WINDOW):
+        self.window = window
+        self._stages = OrderedDict()  # stage -> {'calls', 'total', 'samples'}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as one call of the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {'calls': 0, 'total': 0.0, 'samples': deque(maxlen=self.window)}
+            stage['calls'] += 1
+            stage['total'] += seconds
+            stage['samples'].append(seconds)
+    
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per stage: calls, total and mean ms, and p50/p95/p99 ms over the last `window` calls."""
+        with self._lock:
+            stages = [(name, stage['calls'], stage['total'], list(stage['samples'])) for name, stage in self._stages.items()]
+        
+        snapshot = {}
+        for name, calls, total, samples in stages:
+            percentiles = np.percentile(np.array(samples) * 1000, PROFILE_PERCENTILES)
+            snapshot[name] = {
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / calls, 3),
+                **{f"p{p}_ms": round(float(value), 3) for p, value in zip(PROFILE_PERCENTILES, percentiles)}
+            }
+        return snapshot
+    
+    def format_table(self) -> str:
+        """The snapshot as a plain-text table for the CLI."""
+        lines = [f"{'stage':<20} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for name, stats in self.snapshot().items():
+            lines.append(f"{name:<20} {stats['calls']:>6} {stats['total_ms']:>10.2f} {stats['mean_ms']:>9.2f} "
+                         f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+        return "\n".join(lines)
+
+class OCRInvertedIndex:
+    """Inverted index over tokenized OCR text with BM25 scoring."""
+    
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+    
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}  # term -> (doc ids, term frequencies)
+        self.doc_lengths: List[int] = []
+        self.total_length = 0
+        self._doc_lengths_array = None
+    
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        """Lowercase alphanumeric tokens."""
+        return cls.TOKEN_PATTERN.findall(str(text or '').lower())
+    
+    def add_document(self, text: str) -> int:
+        """Index one document; ids are assigned in insertion order."""
+        doc_id = len(self.doc_lengths)
+        tokens = self.tokenize(text)
+        for term, frequency in Counter(tokens).items():
+            doc_ids, frequencies = self.postings.setdefault(term, ([], []))
+            if isinstance(doc_ids, np.ndarray):
+                # Postings loaded from disk are read-only array views; copy before extending
+                doc_ids, frequencies = doc_ids.tolist(), frequencies.tolist()
+                self.postings[term] = (doc_ids, frequencies)
+            doc_ids.append(doc_id)
+            frequencies.append(frequency)
+        
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        self._doc_lengths_array = None
+        return doc_id
+    
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """BM25-score the documents containing at least one query term.
+        
+        Returns (doc ids, BM25 scores, number of distinct query terms matched), touching
+        only the postings of the query terms.
+        """
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.float64), np.array([], dtype=np.int64))
+        doc_count = len(self.doc_lengths)
+        if doc_count == 0 or self.total_length == 0:
+            return empty
+        
+        if self._doc_lengths_array is None:
+            self._doc_lengths_array = np.asarray(self.doc_lengths, dtype=np.float64)
+        avg_length = self.total_length / doc_count
+        
+        ids_parts = []
+        score_parts = []
+        for term in set(self.tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            doc_ids = np.asarray(posting[0], dtype=np.int64)
+            frequencies = np.asarray(posting[1], dtype=np.float64)
+            
+            idf = math.log(1.0 + (doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            length_norm = 1.0 - self.b + self.b * self._doc_lengths_array[doc_ids] / avg_length
+            ids_parts.append(doc_ids)
+            score_parts.append(idf * frequencies * (self.k1 + 1.0) / (frequencies + self.k1 * length_norm))
+        
+        if not ids_parts:
+            return empty
+        
+        all_ids = np.concatenate(ids_parts)
+        doc_ids, inverse = np.unique(all_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        matched_terms = np.bincount(inverse)
+        return doc_ids, scores, matched_terms
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Flatten the postings into contiguous arrays for the columnar index file."""
+        terms = sorted(self.postings)
+        lengths = [len(self.postings[term][0]) for term in terms]
+        posting_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=posting_offsets[1:])
+        empty = np.array([], dtype=np.int64)
+        return {
+            'terms': "\n".join(terms),
+            'posting_offsets': posting_offsets,
+            'doc_ids': np.concatenate([np.asarray(self.postings[t][0], dtype=np.int64) for t in terms]) if terms else empty,
+            'frequencies': np.concatenate([np.asarray(self.postings[t][1], dtype=np.int64) for t in terms]) if terms else empty,
+            'doc_lengths': np.asarray(self.doc_lengths, dtype=np.int64)
+        }
+    
+    @classmethod
+    def from_arrays(cls, terms: str, posting_offsets: np.ndarray, doc_ids: np.ndarray,
+                    frequencies: np.ndarray, doc_lengths: np.ndarray) -> 'OCRInvertedIndex':
+        """Rebuild an index from to_arrays() output without re-tokenizing any text."""
+        index = cls()
+        term_list = terms.split("\n") if terms else []
+        bounds = posting_offsets.tolist()
+        index.postings = {
+            term: (doc_ids[bounds[i]:bounds[i + 1]], frequencies[bounds[i]:bounds[i + 1]])
+            for i, term in enumerate(term_list)
+        }
+        index.doc_lengths = doc_lengths.tolist()
+        index.total_length = int(doc_lengths.sum())
+        return index
+
+# Binary columnar index file: magic, header length, JSON header, then 8-byte aligned blocks.
+# Numeric fields are fixed-width columns; text fields are a UTF-8 heap plus row offsets.
+COLUMNAR_INDEX_MAGIC = b"VMSIDX01"
+COLUMNAR_INDEX_VERSION = 2
+COLUMNAR_READABLE_VERSIONS = (1, 2)  # Version 1 masks cannot tell a missing key from None in typed columns
+COLUMNAR_ALIGNMENT = 8
+# Cell states in a column's presence mask
+CELL_MISSING = 0
+CELL_PRESENT = 1
+CELL_NULL = 2  # Key present with value None; typed columns have no other way to store it
+
+class ColumnarIndex:
+    """Memory-mapped reader and writer for the columnar screenshot index."""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if self._mm[:len(COLUMNAR_INDEX_MAGIC)] != COLUMNAR_INDEX_MAGIC:
+            raise ValueError(f"{self.path} is not a columnar index file")
+        header_start = len(COLUMNAR_INDEX_MAGIC) + 8
+        (header_length,) = struct.unpack('<Q', self._mm[len(COLUMNAR_INDEX_MAGIC):header_start])
+        self.header = json.loads(self._mm[header_start:header_start + header_length].decode('utf-8'))
+        if self.header.get('version') not in COLUMNAR_READABLE_VERSIONS:
+            raise ValueError(f"Unsupported columnar index version {self.header.get('version')}")
+        
+        self.count = self.header['count']
+        self.columns = {column['name']: column for column in self.header['columns']}
+        self._arrays = {}
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _block(self, name: str) -> np.ndarray:
+        """Zero-copy array view of one data block."""
+        array = self._arrays.get(name)
+        if array is None:
+            block = self.header['blocks'][name]
+            array = np.frombuffer(self._mm, dtype=np.dtype(block['dtype']), count=int(np.prod(block['shape'])),
+                                  offset=block['offset']).reshape(block['shape'])
+            self._arrays[name] = array
+        return array
+    
+    def _heap_string(self, name: str, row: int) -> str:
+        offsets = self._block(f"{name}.offsets")
+        heap = self.header['blocks'][f"{name}.heap"]
+        start = heap['offset'] + int(offsets[row])
+        end = heap['offset'] + int(offsets[row + 1])
+        return self._mm[start:end].decode('utf-8')
+    
+    def close(self):
+        """Unmap the file; required before it is replaced, since Windows cannot replace a mapped file."""
+        if self._mm.closed:
+            return
+        self._arrays.clear()
+        self._mm.close()
+    
+    def cell_state(self, name: str, row: int) -> int:
+        """CELL_MISSING, CELL_PRESENT or CELL_NULL for one cell."""
+        column = self.columns.get(name)
+        if column is None:
+            return CELL_MISSING
+        if not column['has_mask']:
+            return CELL_PRESENT
+        state = int(self._block(f"{name}.present")[row])
+        if state == CELL_MISSING and column['kind'] != 'json' and self.header['version'] == 1:
+            return CELL_NULL  # Version 1 stored missing keys and None alike; keep reading them as None
+        return state
+    
+    def has_value(self, name: str, row: int) -> bool:
+        return self.cell_state(name, row) == CELL_PRESENT
+    
+    def value(self, name: str, row: int):
+        """Decode a single cell; text is only read from the heap here."""
+        kind = self.columns[name]['kind']
+        if kind == 'str':
+            return self._heap_string(name, row)
+        if kind == 'json':
+            return json.loads(self._heap_string(name, row))
+        values = self._block(name)
+        if kind == 'bool':
+            return bool(values[row])
+        if kind == 'int':
+            return int(values[row])
+        if kind == 'float':
+            return float(values[row])
+        if kind == 'int_tuple':
+            return tuple(int(v) for v in values[row])
+        raise ValueError(f"Unknown column kind {kind}")
+    
+    def records(self) -> List['ColumnarRecord']:
+        return [ColumnarRecord(self, row) for row in range(self.count)]
+    
+    def extra(self, name: str):
+        """Auxiliary block (feature matrix, OCR postings) or None if absent."""
+        if name in self.header['blocks']:
+            return self._block(name)
+        if name in self.header.get('strings', {}):
+            return self.header['strings'][name]
+        return None
+    
+    @staticmethod
+    def _plain(value):
+        """Convert numpy scalars and arrays to plain Python values."""
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+    
+    @classmethod
+    def _column_kind(cls, values: List) -> str:
+        present = [v for v in values if v is not None]
+        if not present:
+            return 'json'
+        if all(isinstance(v, bool) for v in present):
+            return 'bool'
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+            return 'int'
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            return 'float'
+        if all(isinstance(v, str) for v in present):
+            return 'str'
+        if (all(isinstance(v, (list, tuple)) for v in present)
+                and len({len(v) for v in present}) == 1
+                and all(isinstance(x, int) and not isinstance(x, bool) for v in present for x in v)):
+            return 'int_tuple'
+        return 'json'
+    
+    @classmethod
+    def write(cls, path: Path, records: List[Dict], arrays: Optional[Dict[str, np.ndarray]] = None,
+              strings: Optional[Dict[str, str]] = None):
+        """Write records plus auxiliary arrays atomically (temp file and rename)."""
+        path = Path(path)
+        count = len(records)
+        names = list(dict.fromkeys(key for data in records for key in data.keys()))
+        blocks = []  # (name, bytes, dtype, shape)
+        columns = []
+        
+        for name in names:
+            raw = [cls._plain(data[name]) if name in data else None for data in records]
+            kind = cls._column_kind(raw)
+            # The JSON kind stores None exactly and masks missing keys; typed kinds also mark None cells
+            mask = np.array([CELL_MISSING if name not in data
+                             else CELL_NULL if kind != 'json' and value is None
+                             else CELL_PRESENT for data, value in zip(records, raw)], dtype=np.uint8)
+            has_mask = not (mask == CELL_PRESENT).all()
+            
+            if kind in ('str', 'json'):
+                encoded = [(json.dumps(v, default=str) if kind == 'json' else (v or '')).encode('utf-8') for v in raw]
+                offsets = np.zeros(count + 1, dtype=np.int64)
+                np.cumsum([len(b) for b in encoded], out=offsets[1:])
+                blocks.append((f"{name}.offsets", offsets))
+                blocks.append((f"{name}.heap", np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+            elif kind == 'int_tuple':
+                width = len(next(v for v in raw if v is not None))
+                blocks.append((name, np.array([v if v is not None else [0] * width for v in raw], dtype=np.int64).reshape(count, width)))
+            else:
+                dtype = {'bool': np.uint8, 'int': np.int64, 'float': np.float64}[kind]
+                blocks.append((name, np.array([v if v is not None else 0 for v in raw], dtype=dtype)))
+            
+            if has_mask:
+                blocks.append((f"{name}.present", mask))
+            columns.append({'name': name, 'kind': kind, 'has_mask': bool(has_mask)})
+        
+        for name, array in (arrays or {}).items():
+            if array is not None:
+                blocks.append((name, np.ascontiguousarray(array)))
+        
+        # Lay out blocks after the header; offsets are absolute and aligned
+        block_meta = {name: {'dtype': array.dtype.str, 'shape': list(array.shape)} for name, array in blocks}
+        header = {'version': COLUMNAR_INDEX_VERSION, 'count': count, 'columns': columns,
+                  'blocks': block_meta, 'strings': strings or {}}
+        
+        def layout(header_length: int) -> int:
+            position = len(COLUMNAR_INDEX_MAGIC) + 8 + header_length
+            for name, array in blocks:
+                position += -position % COLUMNAR_ALIGNMENT
+                block_meta[name]['offset'] = position
+                position += array.nbytes
+            return position
+        
+        # Offsets change the header length; iterate until the layout is stable
+        header_bytes = b""
+        while True:
+            layout(len(header_bytes))
+            new_header_bytes = json.dumps(header).encode('utf-8')
+            if len(new_header_bytes) == len(header_bytes):
+                break
+            header_bytes = new_header_bytes
+        header_bytes = new_header_bytes
+        
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(COLUMNAR_INDEX_MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in blocks:
+                f.write(b"\0" * (block_meta[name]['offset'] - f.tell()))
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+
+# Embedding storage: rows are L2-normalized before saving and memory-mapped on load
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+EMBEDDING_SCORE_CHUNK_ROWS = 65536  # Rows dequantized at a time when scoring reduced-precision storage
+
+class EmbeddingMatrix:
+    """Normalized embedding rows: a memory-mapped base of any supported dtype plus an in-memory float32 tail."""
+    
+    def __init__(self, base: Optional[np.ndarray] = None, scales: Optional[np.ndarray] = None, dimension: int = 0):
+        self.base = base
+        self.scales = scales  # Per-row dequantization scales for int8 storage
+        self.dimension = base.shape[1] if base is not None else dimension
+        self._tail = []
+        self._tail_count = 0
+        self._tail_matrix = None
+    
+    @classmethod
+    def from_embeddings(cls, embeddings: np.ndarray) -> 'EmbeddingMatrix':
+        """In-memory float32 matrix of L2-normalized copies of the given rows."""
+        return cls(base=VisualMemorySearch._normalize_rows(embeddings))
+    
+    @classmethod
+    def load(cls, path: Path, scales_path: Path) -> 'EmbeddingMatrix':
+        """Open embeddings through a read-only memory map so processes share the page cache."""
+        base = np.load(path, mmap_mode='r')
+        if base.ndim != 2:
+            base = np.asarray(base, dtype=np.float32).reshape(len(base), -1)
+        scales = None
+        if base.dtype == np.int8:
+            scales = np.load(scales_path)
+            if len(scales) != len(base):
+                raise ValueError(f"{scales_path.name} has {len(scales)} rows, expected {len(base)}")
+        elif base.dtype not in (np.float32, np.float16):
+            base = np.asarray(base, dtype=np.float32)
+        return cls(base=base, scales=scales)
+    
+    def __len__(self) -> int:
+        return (0 if self.base is None else len(self.base)) + self._tail_count
+    
+    @property
+    def dtype(self) -> str:
+        return 'float32' if self.base is None else self.base.dtype.name
+    
+    def is_normalized(self, sample: int = 64) -> bool:
+        """Whether the first rows have unit norm (files written before normalization on save do not)."""
+        rows = self.rows(0, min(sample, len(self)))
+        norms = np.linalg.norm(rows, axis=1)
+        return bool(np.all((np.abs(norms - 1.0) < 0.02) | (norms == 0)))  # Tolerates int8 rounding
+    
+    def append(self, rows: np.ndarray):
+        """Append already-normalized float32 rows without copying the base."""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.dimension or np.shape(rows)[-1])
+        if not self.dimension:
+            self.dimension = rows.shape[1]
+        self._tail.append(rows)
+        self._tail_count += len(rows)
+        self._tail_matrix = None
+    
+    def _tail_rows(self) -> np.ndarray:
+        if self._tail_matrix is None:
+            self._tail_matrix = (np.vstack(self._tail) if self._tail
+                                 else np.zeros((0, self.dimension), dtype=np.float32))
+            self._tail = [self._tail_matrix]
+        return self._tail_matrix
+    
+    def _dequantize(self, start: int, end: int) -> np.ndarray:
+        """float32 copy of base rows [start, end)."""
+        block = np.asarray(self.base[start:end], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:end, None]
+        return block
+    
+    def rows(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """float32 rows [start, end) across base and tail."""
+        end = len(self) if end is None else min(end, len(self))
+        base_count = 0 if self.base is None else len(self.base)
+        parts = []
+        if start < base_count:
+            parts.append(self._dequantize(start, min(end, base_count)))
+        if end > base_count:
+            parts.append(self._tail_rows()[max(start - base_count, 0):end - base_count])
+        if not parts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.vstack(parts)
+    
+    def row(self, i: int) -> np.ndarray:
+        return self.rows(i, i + 1)[0]
+    
+    def matmul(self, vectors: np.ndarray) -> np.ndarray:
+        """rows @ vectors for a (d,) or (d, m) float32 operand, dequantizing the base in bounded chunks."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        parts = []
+        if self.base is not None and len(self.base):
+            if self.base.dtype == np.float32:
+                parts.append(self.base @ vectors)
+            else:
+                for start in range(0, len(self.base), EMBEDDING_SCORE_CHUNK_ROWS):
+                    parts.append(self._dequantize(start, start + EMBEDDING_SCORE_CHUNK_ROWS) @ vectors)
+        if self._tail_count:
+            parts.append(self._tail_rows() @ vectors)
+        if not parts:
+            return np.zeros((0,) + vectors.shape[1:], dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+    
+    def save(self, path: Path, scales_path: Path, dtype: Optional[str] = None):
+        """Write all rows as dtype (default: current storage dtype), replacing the files atomically."""
+        dtype = dtype or self.dtype
+        matrix = self.rows()
+        scales = None
+        if dtype == 'int8':
+            # Symmetric per-row quantization; rows are unit length so the error stays small
+            scales = (np.abs(matrix).max(axis=1) / 127.0).astype(np.float32)
+            scales[scales == 0] = 1.0
+            stored = np.round(matrix / scales[:, None]).astype(np.int8)
+        else:
+            stored = matrix.astype(dtype)
+        
+        if scales is not None:
+            self._atomic_save(scales_path, scales)
+        self._atomic_save(path, stored)
+        if scales is None and scales_path.exists():
+            scales_path.unlink()
+    
+    @staticmethod
+    def _atomic_save(path: Path, array: np.ndarray):
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+class ColumnarRecord(MutableMapping):
+    """Screenshot record backed by a ColumnarIndex row; fields are decoded on access."""
+    
+    __slots__ = ('_table', '_row', '_overrides')
+    
+    def __init__(self, table: ColumnarIndex, row: int):
+        self._table = table
+        self._row = row
+        self._overrides = {}
+    
+    def __getitem__(self, key):
+        if key in self._overrides:
+            value = self._overrides[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        state = self._table.cell_state(key, self._row)
+        if state == CELL_NULL:
+            return None
+        if state == CELL_MISSING:
+            raise KeyError(key)
+        return self._table.value(key, self._row)
+    
+    def __setitem__(self, key, value):
+        self._overrides[key] = value
+    
+    def __delitem__(self, key):
+        self[key]
+        self._overrides[key] = _DELETED
+    
+    def _keys(self) -> List[str]:
+        table_keys = [name for name in self._table.columns
+                      if self._table.cell_state(name, self._row) != CELL_MISSING]
+        keys = list(dict.fromkeys(table_keys + list(self._overrides)))
+        return [key for key in keys if self._overrides.get(key) is not _DELETED]
+    
+    def __iter__(self):
+        return iter(self._keys())
+    
+    def __len__(self) -> int:
+        return len(self._keys())
+    
+    def __repr__(self) -> str:
+        return f"ColumnarRecord({dict(self)!r})"
+
+_DELETED = object()  # Tombstone for fields removed from a ColumnarRecord
+
+# OpenAI validation verdicts persisted per (query, ordered filenames, index version); final_score is
+# not cached because it mixes in confidence_score, which depends on the scoring mode (exact, ANN, pool)
+VALIDATION_CACHE_TTL = 7 * 24 * 3600  # Seconds
+VALIDATION_CACHE_MAX_ENTRIES = 1000
+VALIDATION_FIELDS = [
+    'openai_score', 'openai_explanation', 'openai_tags', 'openai_confidence',
+    'visual_match_details', 'content_alignment', 'quality_indicators'
+]
+
+class ValidationCache:
+    """Memory-backed, JSON-persisted cache of OpenAI validation results with TTL and size eviction."""
+    
+    def __init__(self, cache_file: Path, ttl: float = VALIDATION_CACHE_TTL, max_entries: int = VALIDATION_CACHE_MAX_ENTRIES):
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> {"created", "index_version", "validations"}
+        self._lock = threading.Lock()
+        self._load()
+    
+    @staticmethod
+    def make_key(query: str, filenames: List[str], index_version: str) -> str:
+        """Key on the normalized query, the ordered result filenames and the index version."""
+        payload = json.dumps([QueryCache.normalize(query), list(filenames), index_version])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _load(self):
+        """Read persisted entries, dropping expired ones."""
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                entries = json.load(f)
+            now = time.time()
+            for key, entry in sorted(entries.items(), key=lambda item: item[1].get('created', 0)):
+                if now - entry.get('created', 0) < self.ttl:
+                    self._entries[key] = entry
+            logger.info(f"Loaded {len(self._entries)} cached OpenAI validations")
+        except Exception as e:
+            logger.warning(f"Failed to load validation cache, starting empty: {e}")
+            self._entries.clear()
+    
+    def _persist(self):
+        """Atomically write all entries to disk. Caller holds the lock."""
+        try:
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to persist validation cache: {e}")
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Cached per-result validation fields, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['created'] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(validation) for validation in entry['validations']]
+    
+    def put(self, key: str, index_version: str, validations: List[Dict]):
+        """Store validations for a key, evicting the oldest entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = {
+                'created': time.time(),
+                'index_version': index_version,
+                'validations': validations
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._persist()
+    
+    def invalidate(self, current_version: str):
+        """Drop every entry computed against a different index version."""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.get('index_version') != current_version]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                logger.info(f"Invalidated {len(stale)} cached OpenAI validations after index change")
+                self._persist()
+    
+    def stats(self) -> Dict:
+        """Size and hit/miss counters."""
+        with self._lock:
+            return {'size': len(self._entries), 'max_entries': self.max_entries, 'hits': self.hits, 'misses': self.misses}
+
+# OpenAI request pacing; defaults match the gpt-4o tier-1 quota and are overridden by the
+# OPENAI_RPM / OPENAI_TPM environment variables
+OPENAI_MAX_IN_FLIGHT = 8  # Concurrent description requests during indexing
+OPENAI_REQUESTS_PER_MINUTE = 500
+OPENAI_TOKENS_PER_MINUTE = 30000
+OPENAI_IMAGE_TOKEN_ESTIMATE = 1105  # High-detail cost of a screenshot scaled to 768px (6 tiles)
+OPENAI_COMPLETION_TOKEN_ESTIMATE = 1000  # Completion tokens reserved up front; max_tokens is only a ceiling
+OPENAI_MAX_RETRIES = 3
+OPENAI_RETRY_BASE_DELAY = 2  # Seconds; doubled after each failed attempt
+
+# Chat-completions backends: "openai" talks to the OpenAI API or any compatible server at
+# LLM_BASE_URL (e.g. mock_llm_server.py); "mock" answers in-process with simulated latency
+LLM_BACKENDS = ('openai', 'mock')
+
+class TokenBucketRateLimiter:
+    """Thread-safe token buckets for requests per minute and tokens per minute.
+    
+    A limit of None or 0 disables that bucket. Token reservations are estimates and can be
+    corrected with adjust() once the response reports actual usage.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[int] = OPENAI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[int] = OPENAI_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+        self._requests = float(self.requests_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Total seconds callers spent blocked, for throughput reporting
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60.0)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60.0)
+    
+    def acquire(self, tokens: int = 0):
+        """Block until one request and the estimated tokens fit in the buckets, then reserve them."""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # A larger request could never be admitted
+        while True:
+            with self._lock:
+                self._refill()
+                request_wait = 0.0
+                token_wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    request_wait = (1 - self._requests) * 60.0 / self.requests_per_minute
+                if self.tokens_per_minute and self._tokens < tokens:
+                    token_wait = (tokens - self._tokens) * 60.0 / self.tokens_per_minute
+                delay = max(request_wait, token_wait)
+                if delay <= 0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+                self.waited += delay
+            time.sleep(delay)
+    
+    def adjust(self, tokens: int):
+        """Charge (positive) or refund (negative) tokens after the actual usage is known."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.tokens_per_minute, self._tokens - tokens)
+
+class HSVQuantizer:
+    """Quantizes HSV pixels with a LUT and counts them with calcHist; bin edges are the COLOR_RANGES bounds."""
+    
+    def __init__(self, color_ranges: Dict[str, List[Tuple[List[int], List[int]]]]):
+        limits = (180, 256, 256)
+        edges = []
+        for channel, limit in enumerate(limits):
+            bounds = {0, limit}
+            for ranges in color_ranges.values():
+                for lower, upper in ranges:
+                    bounds.update((lower[channel], min(upper[channel] + 1, limit)))
+            edges.append(np.array(sorted(bounds)))
+        self.shape = tuple(len(channel_edges) - 1 for channel_edges in edges)
+        self.size = int(np.prod(self.shape))
+        
+        # One 3-channel LUT maps each channel value to its bin index
+        self._lut = np.zeros((1, 256, 3), dtype=np.uint8)
+        for channel, channel_edges in enumerate(edges):
+            bins = np.searchsorted(channel_edges, np.arange(256), side='right') - 1
+            self._lut[0, :, channel] = np.minimum(bins, len(channel_edges) - 2)
+        self._hist_ranges = [bound for bins in self.shape for bound in (0, bins)]
+        
+        # A bin lies entirely inside or outside each range, so its lower corner decides membership
+        lower_corners = np.stack(np.meshgrid(*[channel_edges[:-1] for channel_edges in edges], indexing='ij'), axis=-1)
+        lower_corners = lower_corners.reshape(-1, 3)
+        self.masks = {}
+        for name, ranges in color_ranges.items():
+            mask = np.zeros(self.size, dtype=bool)
+            for lower, upper in ranges:
+                mask |= np.all((lower_corners >= lower) & (lower_corners <= upper), axis=1)
+            self.masks[name] = mask
+    
+    def quantize(self, hsv: np.ndarray) -> np.ndarray:
+        """Per-pixel (hue, saturation, value) bin indices, in one LUT pass."""
+        return cv2.LUT(hsv, self._lut)
+    
+    def histogram(self, bins: np.ndarray) -> np.ndarray:
+        """Pixel count per bin of a quantized image or region, flattened."""
+        if bins.size == 0:
+            return np.zeros(self.size, dtype=np.float64)
+        return cv2.calcHist([np.ascontiguousarray(bins)], [0, 1, 2], None, list(self.shape), self._hist_ranges).ravel().astype(np.float64)
+    
+    def percentage(self, histogram: np.ndarray, color: str) -> float:
+        """Percentage of pixels in the color's ranges, each pixel counted once."""
+        total = histogram.sum()
+        return float(histogram[self.masks[color]].sum() / total * 100) if total else 0.0
+    
+    def region_percentage(self, bins: np.ndarray, color: str) -> float:
+        """Percentage of a quantized region (e.g. a button ROI) in the color's ranges."""
+        return self.percentage(self.histogram(bins), color)
+    
+    def to_sparse(self, histogram: np.ndarray) -> List[List]:
+        """Compact [bin, fraction] pairs of the non-empty bins, for the index record."""
+        total = histogram.sum()
+        if not total:
+            return []
+        bins = np.flatnonzero(histogram)
+        return [[int(b), round(float(histogram[b] / total), 6)] for b in bins]
+    
+    def sparse_percentages(self, sparse: List[List], colors: List[str]) -> List[float]:
+        """Color percentages from a stored sparse histogram, without the pixels."""
+        if not sparse:
+            return [0.0] * len(colors)
+        bins = np.array([int(b) for b, _ in sparse])
+        fractions = np.array([float(f) for _, f in sparse])
+        return [float(fractions[self.masks[color][bins]].sum() * 100) for color in colors]
+
+COLOR_QUANTIZER = HSVQuantizer(COLOR_RANGES)
+
+class ImageFrame:
+    """A screenshot read from disk once, with decoded pixels and derived planes cached on first use."""
+    
+    def __init__(self, file_path, raw_bytes: bytes):
+        self.file_path = Path(file_path)
+        self.raw_bytes = raw_bytes
+        self._bgr = None
+        self._gray = None
+        self._hsv = None
+        self._otsu = None
+        self._color_bins = None
+        self._color_histogram = None
+        self._edges = {}
+        self._ui_contours = None
+        self._analysis_copies = {}
+        self.scale = 1.0  # Pixels of this frame per pixel of the original screenshot
+        self.threshold_scale = 1.0  # Pixels of this frame per reference pixel of the detector thresholds
+    
+    @classmethod
+    def load(cls, file_path) -> 'ImageFrame':
+        """Read the file's bytes; decoding is deferred until pixels are needed."""
+        with open(file_path, 'rb') as f:
+            return cls(file_path, f.read())
+    
+    @property
+    def bgr(self) -> np.ndarray:
+        """Decoded BGR pixels (alpha dropped)."""
+        if self._bgr is None:
+            self._bgr = cv2.imdecode(np.frombuffer(self.raw_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if self._bgr is None:
+                raise ValueError(f"Failed to decode image {self.file_path}")
+        return self._bgr
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) in pixels, like PIL's Image.size."""
+        height, width = self.bgr.shape[:2]
+        return int(width), int(height)
+    
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+    
+    @property
+    def hsv(self) -> np.ndarray:
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+        return self._hsv
+    
+    @property
+    def color_bins(self) -> np.ndarray:
+        """Quantized HSV bins of every pixel (COLOR_QUANTIZER)."""
+        if self._color_bins is None:
+            self._color_bins = COLOR_QUANTIZER.quantize(self.hsv)
+        return self._color_bins
+    
+    @property
+    def color_histogram(self) -> np.ndarray:
+        """Pixel count per quantized HSV bin; every color percentage is derived from it."""
+        if self._color_histogram is None:
+            self._color_histogram = COLOR_QUANTIZER.histogram(self.color_bins)
+        return self._color_histogram
+    
+    @property
+    def otsu(self) -> np.ndarray:
+        """Otsu-thresholded binary of the gray plane."""
+        if self._otsu is None:
+            self._otsu = cv2.threshold(self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        return self._otsu
+    
+    def edges(self, low: int, high: int) -> np.ndarray:
+        """Canny edge map of the gray plane for the given thresholds."""
+        key = (low, high)
+        if key not in self._edges:
+            self._edges[key] = cv2.Canny(self.gray, low, high)
+        return self._edges[key]
+    
+    @property
+    def ui_contours(self) -> 'ContourSet':
+        """Contour set of the shared UI edge map, computed once for all UI detectors."""
+        if self._ui_contours is None:
+            self._ui_contours = ContourSet(self.edges(*UI_EDGE_THRESHOLDS), self.threshold_scale)
+        return self._ui_contours
+    
+    @property
+    def pixel_density(self) -> float:
+        """Device pixels per logical pixel from the file's DPI metadata (macOS retina captures store 144 DPI)."""
+        try:
+            dpi = Image.open(io.BytesIO(self.raw_bytes)).info.get('dpi')
+        except Exception:
+            return 1.0
+        if not dpi or float(dpi[0]) < 120:  # 72 and 96 DPI are standard density
+            return 1.0
+        return float(round(float(dpi[0]) / 72))
+    
+    def analysis_copy(self, scale: float, threshold_scale: float) -> 'ImageFrame':
+        """Downscaled copy (area interpolation) for the OpenCV detectors, cached per scale; OCR keeps this frame."""
+        if scale >= 1.0 and threshold_scale == 1.0:
+            return self
+        key = (scale, threshold_scale)
+        if key not in self._analysis_copies:
+            width, height = self.size
+            copy = ImageFrame(self.file_path, self.raw_bytes)
+            copy._bgr = cv2.resize(self.bgr, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            copy.scale = scale
+            copy.threshold_scale = threshold_scale
+            self._analysis_copies[key] = copy
+        return self._analysis_copies[key]
+    
+    def to_pil(self, max_size: Optional[int] = None) -> 'Image.Image':
+        """RGB PIL image, downscaled so its longest side is at most max_size."""
+        image = Image.fromarray(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+        if max_size and max(image.size) > max_size:
+            ratio = max_size / max(image.size)
+            new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+        return image
+    
+    def to_base64(self) -> str:
+        """Base64 of the original file bytes, for data URLs."""
+        return base64.b64encode(self.raw_bytes).decode('utf-8')
+
+# UI structure analysis: one Canny map and one external-contour pass shared by every layout detector.
+# Canny is monotone in its thresholds, so the 20/80 map is exactly the union of the 30/100 and 50/150 maps.
+# Its external contours are not the union of theirs, though: extra edges merge and enclose outlines.
+# The pattern, content-type and form detectors used their own 50/150 map (and HoughLines for grids),
+# so their tags can differ from before; FEATURE_EXTRACTOR_VERSION "5" re-extracts cached records.
+UI_EDGE_THRESHOLDS = (20, 80)
+UI_LINE_MIN_LENGTH = 100  # Straight contour segments at least this long count as layout lines
+BUTTON_WIDTH_RANGE = (30, 400)
+BUTTON_HEIGHT_RANGE = (20, 120)
+BUTTON_BORDER_MARGIN = 5  # Rectangles touching the image border are not buttons
+MAX_DETECTED_BUTTONS = 10
+
+# Reduced-resolution analysis: the OpenCV detectors run on a copy downscaled by analysis_scale, with their
+# pixel thresholds scaled to match. High-DPI captures (DPI metadata) are first reduced to logical pixels
+# without scaling the thresholds, so a retina button measures the same as at 1x. A longest side still above
+# ANALYSIS_MAX_SIDE is capped with the thresholds scaled too, so they stay in the capture's own pixels.
+ANALYSIS_MAX_SIDE = 2560
+
+class ContourSet:
+    """External contours of one edge map, with the per-contour geometry the UI detectors read."""
+    
+    def __init__(self, edges: np.ndarray, scale: float = 1.0):
+        self.height, self.width = edges.shape[:2]
+        self.scale = scale  # Analysis pixels per reference pixel of the size thresholds
+        self.contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        count = len(self.contours)
+        self.bboxes = np.array([cv2.boundingRect(c) for c in self.contours], dtype=np.int64).reshape(count, 4)
+        self.areas = np.array([cv2.contourArea(c) for c in self.contours], dtype=np.float64)
+        self.perimeters = np.array([cv2.arcLength(c, True) for c in self.contours], dtype=np.float64)
+        self.aspect_ratios = self.bboxes[:, 2] / np.maximum(self.bboxes[:, 3], 1)
+        
+        # Polygon approximation only where a detector reads it: button-sized boxes and
+        # outlines long enough to hold a layout line (a closed segment is at most half the perimeter)
+        widths, heights = self.bboxes[:, 2], self.bboxes[:, 3]
+        self.button_sized = ((widths >= BUTTON_WIDTH_RANGE[0] * scale) & (widths <= BUTTON_WIDTH_RANGE[1] * scale)
+                             & (heights >= BUTTON_HEIGHT_RANGE[0] * scale) & (heights <= BUTTON_HEIGHT_RANGE[1] * scale))
+        line_min_length = UI_LINE_MIN_LENGTH * scale
+        self.vertex_counts = np.zeros(count, dtype=np.int64)
+        self.line_count = 0
+        for i in np.flatnonzero(self.button_sized | (self.perimeters >= 2 * line_min_length)):
+            approx = cv2.approxPolyDP(self.contours[i], 0.02 * self.perimeters[i], True).reshape(-1, 2)
+            self.vertex_counts[i] = len(approx)
+            if len(approx) > 1:
+                segment_lengths = np.hypot(*(np.roll(approx, -1, axis=0) - approx).T)
+                self.line_count += int(np.count_nonzero(segment_lengths >= line_min_length))
+    
+    def __len__(self) -> int:
+        return len(self.contours)
+    
+    def button_candidates(self) -> np.ndarray:
+        """Indices of roughly rectangular (4-6 vertex), button-sized contours clear of the image border."""
+        x, y, w, h = self.bboxes.T
+        margin = BUTTON_BORDER_MARGIN * self.scale
+        inside = (x > margin) & (y > margin) & (x + w < self.width - margin) & (y + h < self.height - margin)
+        rectangular = (self.vertex_counts >= 4) & (self.vertex_counts <= 6)
+        return np.flatnonzero(self.button_sized & rectangular & inside)
+
+# Content-hash feature cache; bump a version to invalidate the matching cached entries
+FEATURE_EXTRACTOR_VERSION = "5"  # OCR and OpenCV detector output, layout detectors on the shared 20/80 contours
+DESCRIPTION_PROMPT_VERSION = "1"  # Prompt in _generate_openai_description
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+VISION_MODEL_NAME = 'Salesforce/blip-image-captioning-base'  # Local captioner when OpenAI is unavailable
+CACHED_RECORD_FIELDS = [
+    'ocr_text', 'visual_description', 'dimensions',
+    'blue_button_detected', 'blue_button_count', 'blue_button_details', 'blue_percentage', 'color_histogram',
+    'description_source'
+]
+
+class FeatureCache:
+    """Append-only JSONL cache of extracted screenshot features and embeddings, keyed by content hash."""
+    
+    def __init__(self, cache_file: Path):
+        self.cache_file = Path(cache_file)
+        self._entries = {}  # content hash -> {"extractor_key", "record", "embedding_model", "embedding_text", "embedding"}
+        self._lock = threading.Lock()
+        self._load()
+    
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+    
+    @staticmethod
+    def hash_file(file_path: Path) -> str:
+        """SHA-256 of a file's contents, read in chunks."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    
+    def _load(self):
+        """Replay the cache log; later lines for a hash override earlier ones."""
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn final write
+                    content_hash = entry.pop('hash')
+                    if 'record' in entry:
+                        # A new record invalidates any embedding computed from the old one
+                        self._entries[content_hash] = entry
+                    elif content_hash in self._entries:
+                        self._entries[content_hash].update(entry)
+            logger.info(f"Loaded feature cache with {len(self._entries)} entries")
+        except Exception as e:
+            logger.warning(f"Failed to load feature cache, starting empty: {e}")
+            self._entries = {}
+    
+    def _append(self, line: Dict):
+        try:
+            with open(self.cache_file, 'a') as f:
+                f.write(json.dumps(line) + "\n")
+        except Exception as e:
+            logger.warning(f"Failed to append to feature cache: {e}")
+    
+    def get_record(self, content_hash: str, extractor_key: str) -> Optional[Dict]:
+        """Cached extracted fields for this content, or None if missing or from another extractor version."""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is None or entry.get('extractor_key') != extractor_key:
+                return None
+            return dict(entry['record'])
+    
+    def put_record(self, content_hash: str, extractor_key: str, record: Dict):
+        fields = {field: record.get(field) for field in CACHED_RECORD_FIELDS}
+        with self._lock:
+            self._entries[content_hash] = {'extractor_key': extractor_key, 'record': fields}
+            self._append({'hash': content_hash, 'extractor_key': extractor_key, 'record': fields})
+    
+    def get_embedding(self, content_hash: str, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Cached embedding of exactly this text under this model, or None."""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if (entry is None or entry.get('embedding_model') != model_name
+                    or entry.get('embedding_text') != self._text_key(text)):
+                return None
+            return np.frombuffer(base64.b64decode(entry['embedding']), dtype=np.float32)
+    
+    def put_embedding(self, content_hash: str, model_name: str, text: str, embedding: np.ndarray):
+        line = {
+            'embedding_model': model_name,
+            'embedding_text': self._text_key(text),
+            'embedding': base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode('ascii')
+        }
+        with self._lock:
+            if content_hash not in self._entries:
+                return
+            self._entries[content_hash].update(line)
+            self._append(dict(line, hash=content_hash))
+    
+    def compact(self, keep_hashes: Optional[set] = None):
+        """Rewrite the log with one line per live entry, optionally dropping hashes not in keep_hashes."""
+        with self._lock:
+            if keep_hashes is not None:
+                self._entries = {h: entry for h, entry in self._entries.items() if h in keep_hashes}
+            try:
+                tmp_file = self.cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w') as f:
+                    for content_hash, entry in self._entries.items():
+                        f.write(json.dumps(dict(entry, hash=content_hash)) + "\n")
+                os.replace(tmp_file, self.cache_file)
+            except Exception as e:
+                logger.warning(f"Failed to compact feature cache: {e}")
+
+# OCR modes: "full" runs Tesseract once on the whole frame; "tiled" splits large frames into
+# overlapping horizontal bands OCRed in parallel and keeps each text line from the band that owns it
+OCR_MODES = ('full', 'tiled')
+OCR_TILE_MIN_PIXELS = 4_000_000  # Smaller frames are OCRed whole even in tiled mode
+OCR_TILE_TARGET_PIXELS = 1_500_000  # Approximate pixels per band
+OCR_TILE_OVERLAP = 128  # Rows shared by adjacent bands; at least twice the tallest expected text line
+OCR_TILE_WORKERS = os.cpu_count() or 1
+
+# Parallel ingestion
+MAX_DESCRIPTION_IMAGE_SIZE = 2048  # Longest side passed to captioning models
+CAPTION_BATCH_SIZE = 8  # Images per local captioning batch in the parent process
+
+# Per-process engine used by ingestion workers; detectors need no models or index state
+_ingest_engine = None
+
+def _init_ingest_worker(settings: Dict):
+    """Process-pool initializer: one bare engine per worker, single-threaded OpenCV."""
+    global _ingest_engine
+    cv2.setNumThreads(1)
+    _ingest_engine = VisualMemorySearch.__new__(VisualMemorySearch)
+    for name, value in settings.items():
+        setattr(_ingest_engine, name, value)
+
+def _ingest_worker(task: Tuple[str, bool]) -> Optional[Dict]:
+    """Run the CPU-bound OCR and OpenCV stages for one screenshot in a worker process."""
+    file_path, include_ui_analysis = task
+    try:
+        return _ingest_engine._extract_cpu_features(Path(file_path), include_ui_analysis)
+    except Exception as e:
+        logger.error(f"Failed to process {file_path}: {e}")
+        return None
+
 class VisualMemorySearch:
     """Main class for visual memory search functionality."""
     
-    def __init__(self, screenshot_dir: str):
+    def __init__(self, screenshot_dir: str, ann_index_type: str = 'flat', query_cache_size: int = QUERY_CACHE_SIZE,
+                 ingest_workers: int = 1, embedding_dtype: Optional[str] = None, enable_openai: bool = True,
+                 openai_concurrency: int = OPENAI_MAX_IN_FLIGHT, openai_rpm: Optional[int] = None,
+                 openai_tpm: Optional[int] = None, llm_backend: Optional[str] = None,
+                 llm_base_url: Optional[str] = None, ocr_mode: Optional[str] = None,
+                 analysis_scale: Optional[float] = None, candidate_pool: int = 0):
         # Load environment variables first
         load_dotenv()
         
+        if ann_index_type not in ANN_INDEX_TYPES:
+            raise ValueError(f"Unknown ANN index type '{ann_index_type}', expected one of {ANN_INDEX_TYPES}")
+        if ocr_mode is not None and ocr_mode not in OCR_MODES:
+            raise ValueError(f"Unknown OCR mode '{ocr_mode}', expected one of {OCR_MODES}")
+        if analysis_scale is not None and not 0 < analysis_scale <= 1:
+            raise ValueError(f"Analysis scale must be in (0, 1], got {analysis_scale}")
+        if candidate_pool < 0:
+            raise ValueError(f"Candidate pool must be >= 0, got {candidate_pool}")
+        if llm_backend is not None and llm_backend not in LLM_BACKENDS:
+            raise ValueError(f"Unknown LLM backend '{llm_backend}', expected one of {LLM_BACKENDS}")
+        if embedding_dtype is not None and embedding_dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{embedding_dtype}', expected one of {EMBEDDING_DTYPES}")
+        
         self.screenshot_dir = Path(screenshot_dir)
-        self.index_file = self.screenshot_dir / "search_index.json"
+        self.ingest_workers = ingest_workers if ingest_workers > 0 else (os.cpu_count() or 1)
+        # Stored with the index; an explicit ocr_mode overrides the stored one for new extractions
+        self._requested_ocr_mode = ocr_mode
+        self.ocr_mode = ocr_mode or 'full'
+        # Stored with the index like ocr_mode; 1.0 analyzes at native resolution (capped at ANALYSIS_MAX_SIDE)
+        self._requested_analysis_scale = analysis_scale
+        self.analysis_scale = analysis_scale or 1.0
+        self.index_file = self.screenshot_dir / "search_index.vmsi"
+        self.legacy_index_file = self.screenshot_dir / "search_index.json"  # Pre-columnar format, migrated on load
         self.embeddings_file = self.screenshot_dir / "embeddings.npy"
-        self.index = None
+        self.embedding_scales_file = self.screenshot_dir / "embeddings.scales.npy"  # Only for int8 storage
+        self.embedding_dtype = embedding_dtype  # None keeps the dtype found on disk (float32 for new indexes)
+        self.ann_index_type = ann_index_type
+        self.ann_index_file = self.screenshot_dir / f"faiss_{ann_index_type}.index"
+        self.ann_meta_file = self.screenshot_dir / f"faiss_{ann_index_type}.index.json"  # Embedding fingerprint
+        # Two-stage retrieval: boost only the top candidate_pool dense matches (0 boosts every screenshot)
+        self.candidate_pool = candidate_pool
+        self.journal_file = self.screenshot_dir / "search_index.journal.jsonl"
+        self._journal_count = 0
+        self._columnar_table = None  # Mapped ColumnarIndex the loaded records and arrays point into
+        self.index = None  # EmbeddingMatrix of normalized rows
+        self.ann_index = None
+        self._feature_matrix = None
+        self._numeric_features = None
+        self.ocr_index = OCRInvertedIndex()
+        self.query_cache = QueryCache(query_cache_size)
+        self.profiler = SearchProfiler()
+        self.validation_cache = ValidationCache(self.screenshot_dir / "validation_cache.json")
+        self.feature_cache = FeatureCache(self.screenshot_dir / "feature_cache.jsonl")
+        self.index_version = None
         self.screenshots_data = []
-        self.text_model = None
-        self.vision_model = None
-        self.embedding_model = None
         
-        # OpenAI configuration
-        self.openai_client = None
-        self.use_openai = self._setup_openai()
+        # Models load on first use (see warm_up); a search-only process only needs the embedding model
+        self._embedding_model = None
+        self._vision_model = None
+        self._model_lock = threading.Lock()
         
-        # Initialize models
-        self._initialize_models()
+        # OpenAI configuration
+        self.openai_client = None  # Any client exposing chat.completions.create (OpenAI SDK or MockChatClient)
+        self.llm_backend = llm_backend  # None: LLM_BACKEND env var, default 'openai'
+        self.llm_base_url = llm_base_url  # None: LLM_BASE_URL env var, default api.openai.com
+        self.openai_concurrency = max(1, openai_concurrency)
+        # None reads OPENAI_RPM / OPENAI_TPM so app.py and other embedders can set them; 0 disables a limit
+        if openai_rpm is None:
+            openai_rpm = int(os.getenv('OPENAI_RPM', OPENAI_REQUESTS_PER_MINUTE))
+        if openai_tpm is None:
+            openai_tpm = int(os.getenv('OPENAI_TPM', OPENAI_TOKENS_PER_MINUTE))
+        self.openai_limiter = TokenBucketRateLimiter(openai_rpm, openai_tpm)
+        # Metadata-only callers skip the client and its connection test
+        self.use_openai = self._setup_openai() if enable_openai else False
         
         # Load or create index
         self._load_or_create_index()
     
     def _setup_openai(self):
-        """Setup OpenAI client if API key is available."""
+        """Setup the chat-completions client: OpenAI (or a compatible server at LLM_BASE_URL) or the in-process mock."""
         try:
             # Load environment variables
             load_dotenv()
             
-            api_key = os.getenv('OPENAI_API_KEY')
+            backend = self.llm_backend or os.getenv('LLM_BACKEND', 'openai')
+            if backend == 'mock':
+                from mock_llm_server import MockChatClient
+                self.openai_client = MockChatClient(
+                    latency_ms=float(os.getenv('MOCK_LLM_LATENCY_MS', 0)),
+                    jitter_ms=float(os.getenv('MOCK_LLM_JITTER_MS', 0)),
+                    error_rate=float(os.getenv('MOCK_LLM_ERROR_RATE', 0))
+                )
+                logger.info("Using in-process mock LLM backend")
+                return True
+            
+            # A local compatible server needs no real key
+            base_url = self.llm_base_url or os.getenv('LLM_BASE_URL')
+            api_key = os.getenv('OPENAI_API_KEY') or ('local' if base_url else None)
             if api_key:
                 # Create client with minimal parameters to avoid configuration issues
                 try:
                     # Create httpx client without proxies to avoid configuration issues
                     import httpx
                     http_client = httpx.Client()
-                    self.openai_client = openai.OpenAI(api_key=api_key, http_client=http_client)
+                    self.openai_client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+                    if base_url:
+                        logger.info(f"Using OpenAI-compatible endpoint {base_url}")
                     
                     # Test the connection
                     try:
@@ -110,29 +1451,68 @@ class VisualMemorySearch:
             logger.error(f"OpenAI setup failed: {e}")
             return False
     
-    def _initialize_models(self):
-        """Initialize the AI models for text and vision processing."""
-        try:
-            logger.info("Initializing AI models...")
-            
-            # Text embedding model for semantic search
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            # Vision model for image description
-            self.vision_model = pipeline("image-to-text", model="Salesforce/blip-image-captioning-base")
-            
-            # Text model for query understanding
-            self.text_model = pipeline("text-classification", model="facebook/bart-large-mnli")
-            
-            logger.info("Models initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize models: {e}")
-            raise
+    def _load_model(self, attribute: str, name: str, loader):
+        """Load a model into attribute once, even when several threads ask for it at the same time."""
+        model = getattr(self, attribute)
+        if model is not None:
+            return model
+        with self._model_lock:
+            model = getattr(self, attribute)
+            if model is None:
+                try:
+                    logger.info(f"Loading model {name}...")
+                    start = time.time()
+                    model = loader()
+                    setattr(self, attribute, model)
+                    logger.info(f"Loaded model {name} in {time.time() - start:.1f}s")
+                except Exception as e:
+                    logger.error(f"Failed to load model {name}: {e}")
+                    raise
+        return model
+    
+    @property
+    def embedding_model(self):
+        """Text embedding model for semantic search, loaded on first use."""
+        return self._load_model('_embedding_model', EMBEDDING_MODEL_NAME,
+                                lambda: sentence_transformers.SentenceTransformer(EMBEDDING_MODEL_NAME))
+    
+    @embedding_model.setter
+    def embedding_model(self, model):
+        self._embedding_model = model
+    
+    @property
+    def vision_model(self):
+        """Local image captioning model, loaded the first time a screenshot needs a description without OpenAI."""
+        return self._load_model('_vision_model', VISION_MODEL_NAME,
+                                lambda: transformers.pipeline("image-to-text", model=VISION_MODEL_NAME))
+    
+    @vision_model.setter
+    def vision_model(self, model):
+        self._vision_model = model
+    
+    def warm_up(self, models: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Load models ahead of the first request.
+        
+        models is a list of 'embedding' and/or 'vision'; by default the embedding model is loaded,
+        plus the captioner when OpenAI is unavailable. Returns which models are now loaded.
+        """
+        if models is None:
+            models = ['embedding'] if self.use_openai else ['embedding', 'vision']
+        for name in models:
+            if name == 'embedding':
+                self.embedding_model
+            elif name == 'vision':
+                self.vision_model
+            else:
+                raise ValueError(f"Unknown model '{name}', expected 'embedding' or 'vision'")
+        return self.loaded_models()
+    
+    def loaded_models(self) -> Dict[str, bool]:
+        return {'embedding': self._embedding_model is not None, 'vision': self._vision_model is not None}
     
     def _load_or_create_index(self):
         """Load existing index or create new one."""
-        if self.index_file.exists() and self.embeddings_file.exists():
+        if (self.index_file.exists() or self.legacy_index_file.exists()) and self.embeddings_file.exists():
             logger.info("Loading existing search index...")
             self._load_index()
         else:
@@ -142,13 +1522,40 @@ class VisualMemorySearch:
     def _load_index(self):
         """Load existing index from files."""
         try:
-            with open(self.index_file, 'r') as f:
-                self.screenshots_data = json.load(f)
-            
-            self.index = np.load(self.embeddings_file)
-            
-            # Clean up any existing data that might contain numpy types
-            self._cleanup_screenshot_data()
+            self._release_columnar_index(keep=False)
+            migrate = not self.index_file.exists()
+            self._feature_matrix = None
+            self._numeric_features = None
+            self.ocr_index = OCRInvertedIndex()
+            
+            if migrate:
+                logger.info(f"Migrating {self.legacy_index_file.name} to the columnar index format...")
+                with open(self.legacy_index_file, 'r') as f:
+                    self.screenshots_data = json.load(f)
+                # Clean up any existing data that might contain numpy types
+                self._cleanup_screenshot_data()
+            else:
+                self._load_columnar_index()
+            
+            self.index = EmbeddingMatrix.load(self.embeddings_file, self.embedding_scales_file)
+            if len(self.index) and not self.index.is_normalized():
+                # Raw embeddings from older versions; normalize once and store them normalized
+                logger.info("Normalizing stored embeddings...")
+                self.index = EmbeddingMatrix.from_embeddings(self.index.rows())
+                migrate = True
+            elif self.embedding_dtype and self.embedding_dtype != self.index.dtype:
+                migrate = True
+            self._replay_journal()
+            # The FAISS index is loaded on the first ANN search so plain loads never import FAISS
+            self.ann_index = None
+            
+            # Only rows missing from the index file (journaled or migrated) are computed here
+            self._ensure_features()
+            self._ensure_ocr_index()
+            
+            if migrate:
+                self._save_index()
+            self._refresh_index_version()
             
             logger.info(f"Loaded index with {len(self.screenshots_data)} screenshots")
             
@@ -156,10 +1563,68 @@ class VisualMemorySearch:
             logger.error(f"Failed to load index: {e}")
             self._create_index()
     
+    def _load_columnar_index(self):
+        """Map the columnar index file; text stays on disk until a record field is read."""
+        table = ColumnarIndex(self.index_file)
+        self._columnar_table = table
+        self.screenshots_data = table.records()
+        if self._requested_ocr_mode is None:
+            self.ocr_mode = table.extra('ocr_mode') or 'full'
+        if self._requested_analysis_scale is None:
+            self.analysis_scale = float(table.extra('analysis_scale') or 1.0)
+        
+        # Feature flags are only reused if they were computed for the current vocabulary
+        feature_matrix = table.extra('feature_matrix')
+        if (feature_matrix is not None and table.extra('feature_columns') == "\n".join(FEATURE_COLUMNS)
+                and table.extra('numeric_feature_columns') == "\n".join(NUMERIC_FEATURE_COLUMNS)):
+            self._feature_matrix = feature_matrix
+            self._numeric_features = table.extra('numeric_features')
+        
+        if table.extra('ocr.doc_lengths') is not None:
+            self.ocr_index = OCRInvertedIndex.from_arrays(
+                table.extra('ocr.terms'), table.extra('ocr.posting_offsets'), table.extra('ocr.doc_ids'),
+                table.extra('ocr.frequencies'), table.extra('ocr.doc_lengths')
+            )
+    
+    def _release_columnar_index(self, keep: bool = True):
+        """Unmap the loaded index file before it is rewritten or reloaded.
+        
+        With keep, records, feature arrays and OCR postings that still point into the mapping are
+        copied into memory first; otherwise the caller is about to replace them.
+        """
+        table = self._columnar_table
+        if table is None:
+            return
+        self._columnar_table = None
+        if keep:
+            self.screenshots_data = [dict(data) if isinstance(data, ColumnarRecord) else data
+                                     for data in self.screenshots_data]
+            if self._feature_matrix is not None:
+                self._feature_matrix = np.array(self._feature_matrix)
+                self._numeric_features = np.array(self._numeric_features)
+            self.ocr_index.postings = {term: (np.array(doc_ids), np.array(frequencies))
+                                       for term, (doc_ids, frequencies) in self.ocr_index.postings.items()}
+        else:
+            self.screenshots_data = []
+            self._feature_matrix = None
+            self._numeric_features = None
+            self.ocr_index = OCRInvertedIndex()
+        try:
+            table.close()
+        except BufferError:
+            # Some array view outlived the release; the mapping closes when it is collected
+            logger.warning(f"Could not unmap {table.path.name}; an array view is still in use")
+    
     def _create_index(self):
         """Create new index by processing all screenshots."""
+        self._release_columnar_index(keep=False)
         self.screenshots_data = []
         self.index = None
+        self.ann_index = None
+        self._remove_ann_files()
+        self._feature_matrix = None
+        self._numeric_features = None
+        self.ocr_index = OCRInvertedIndex()
         
         # Process all screenshots in directory
         screenshot_files = list(self.screenshot_dir.glob("*.png")) + list(self.screenshot_dir.glob("*.jpg")) + list(self.screenshot_dir.glob("*.jpeg"))
@@ -170,13 +1635,48 @@ class VisualMemorySearch:
         
         logger.info(f"Processing {len(screenshot_files)} screenshots...")
         
+        # Reuse cached features for unchanged content; only stale files go through extraction
+        records_by_path = {}
+        live_hashes = set()
+        stale_files = []
         for screenshot_file in screenshot_files:
             try:
-                screenshot_data = self._process_screenshot(screenshot_file)
-                if screenshot_data:
-                    self.screenshots_data.append(screenshot_data)
-            except Exception as e:
-                logger.error(f"Failed to process {screenshot_file}: {e}")
+                content_hash = FeatureCache.hash_file(screenshot_file)
+            except OSError as e:
+                logger.error(f"Failed to read {screenshot_file}: {e}")
+                continue
+            live_hashes.add(content_hash)
+            cached_record = self._cached_screenshot_record(screenshot_file, content_hash)
+            if cached_record:
+                records_by_path[str(screenshot_file)] = cached_record
+            else:
+                stale_files.append(screenshot_file)
+        
+        logger.info(f"Feature cache: reusing {len(records_by_path)} screenshots, extracting {len(stale_files)}")
+        
+        processed = []
+        if self.ingest_workers > 1 and len(stale_files) > 1:
+            processed = self._process_screenshots_parallel(stale_files)
+        else:
+            # Descriptions are network-bound, so request them concurrently before the per-file stages
+            use_openai = self.use_openai and self.openai_client and len(stale_files) > 1
+            descriptions = self._generate_openai_descriptions(stale_files) if use_openai else {}
+            for screenshot_file in stale_files:
+                try:
+                    screenshot_data = self._process_screenshot(screenshot_file, descriptions.get(str(screenshot_file)),
+                                                               self._description_source(openai=True),
+                                                               allow_openai=not use_openai)
+                    if screenshot_data:
+                        processed.append(screenshot_data)
+                except Exception as e:
+                    logger.error(f"Failed to process {screenshot_file}: {e}")
+        
+        for screenshot_data in processed:
+            self._remember_features(screenshot_data)
+            records_by_path[screenshot_data['file_path']] = screenshot_data
+        
+        # Keep directory order regardless of which records came from the cache
+        self.screenshots_data = [records_by_path[str(f)] for f in screenshot_files if str(f) in records_by_path]
         
         if self.screenshots_data:
             # Clean up data before building index
@@ -184,99 +1684,338 @@ class VisualMemorySearch:
             self._build_search_index()
             self._save_index()
             logger.info(f"Index created with {len(self.screenshots_data)} screenshots")
+        
+        # Drop cache entries for files no longer in the directory
+        self.feature_cache.compact(keep_hashes=live_hashes)
+    
+    @staticmethod
+    def _description_source(openai: bool) -> str:
+        """Tag for where a visual description came from, stored on each record."""
+        return f"openai-{DESCRIPTION_PROMPT_VERSION}" if openai else "local"
+    
+    def _feature_extractor_key(self, description_source: Optional[str] = None) -> str:
+        """Identifies the extractors and description source that produced cached features.
+        
+        Without description_source, the source a fresh extraction would use: records whose
+        OpenAI call fell back to a local caption never match while OpenAI is configured.
+        """
+        if description_source is None:
+            description_source = self._description_source(openai=bool(self.use_openai and self.openai_client))
+        return f"{FEATURE_EXTRACTOR_VERSION}:{self.ocr_mode}:{self.analysis_scale:g}:{description_source}"
+    
+    def _cached_screenshot_record(self, file_path: Path, content_hash: str) -> Optional[Dict]:
+        """Index record rebuilt from the feature cache, or None if the content has no current entry."""
+        cached = self.feature_cache.get_record(content_hash, self._feature_extractor_key())
+        if cached is None:
+            return None
+        
+        record = {
+            "file_path": str(file_path),
+            "filename": str(file_path.name),
+            "file_size": int(file_path.stat().st_size),
+            "content_hash": content_hash
+        }
+        record.update(cached)
+        record["dimensions"] = tuple(int(d) for d in record["dimensions"])
+        return record
     
-    def _process_screenshot(self, file_path: Path) -> Optional[Dict]:
-        """Process a single screenshot to extract text and visual information with enhanced blue button detection."""
+    def _remember_features(self, screenshot_data: Dict):
+        """Store freshly extracted features unless extraction fell back to a placeholder description."""
+        if screenshot_data.get('content_hash') and screenshot_data.get('visual_description') != "Unable to generate visual description":
+            description_source = screenshot_data.get('description_source', self._description_source(openai=False))
+            self.feature_cache.put_record(screenshot_data['content_hash'], self._feature_extractor_key(description_source),
+                                          screenshot_data)
+    
+    def _process_screenshot(self, file_path: Path, visual_description: Optional[str] = None,
+                            description_source: Optional[str] = None, allow_openai: bool = True) -> Optional[Dict]:
+        """Process a single screenshot to extract text and visual information with enhanced blue button detection.
+        
+        A visual_description obtained earlier (e.g. from the concurrent OpenAI stage) is used as is,
+        tagged with its description_source.
+        """
         try:
-            # Load image
-            image = Image.open(file_path)
+            # Load image once; every stage shares the decoded frame
+            frame = ImageFrame.load(file_path)
             
             # Extract OCR text
-            ocr_text = self._extract_ocr_text(image)
+            ocr_text = self._extract_ocr_text(frame)
             
             # Generate visual description
-            visual_description = self._generate_visual_description(file_path, image)
+            if not visual_description:
+                visual_description, description_source = self._generate_visual_description(frame, allow_openai=allow_openai)
             
             # Enhanced blue button detection
-            blue_button_info = self._detect_blue_buttons_enhanced(file_path)
-            
-            # Create screenshot data - ensure all values are JSON serializable
-            screenshot_data = {
-                "file_path": str(file_path),
-                "filename": str(file_path.name),  # Ensure filename is string
-                "ocr_text": str(ocr_text) if ocr_text else "",
-                "visual_description": str(visual_description) if visual_description else "",
-                "file_size": int(file_path.stat().st_size),
-                "dimensions": tuple(int(d) for d in image.size),  # Convert to tuple of ints
-                "blue_button_detected": bool(blue_button_info['detected']),
-                "blue_button_count": int(blue_button_info['count']),
-                "blue_button_details": str(blue_button_info['details']) if blue_button_info['details'] else ""
-            }
-            
-            logger.info(f"Processed {file_path.name}: blue_button={blue_button_info['detected']}, count={blue_button_info['count']}")
+            blue_button_info = self._detect_blue_buttons_enhanced(frame)
             
-            return screenshot_data
+            return self._build_screenshot_record(file_path, ocr_text, visual_description, frame.size, blue_button_info,
+                                                 FeatureCache.hash_bytes(frame.raw_bytes), description_source)
             
         except Exception as e:
             logger.error(f"Error processing {file_path}: {e}")
             return None
     
-    def _extract_ocr_text(self, image: Image.Image) -> str:
+    def _build_screenshot_record(self, file_path: Path, ocr_text: str, visual_description: str,
+                                 dimensions: Tuple[int, int], blue_button_info: Dict,
+                                 content_hash: Optional[str] = None, description_source: Optional[str] = None) -> Dict:
+        """Assemble the index record for a screenshot - ensure all values are JSON serializable."""
+        screenshot_data = {
+            "file_path": str(file_path),
+            "filename": str(file_path.name),  # Ensure filename is string
+            "ocr_text": str(ocr_text) if ocr_text else "",
+            "visual_description": str(visual_description) if visual_description else "",
+            "file_size": int(file_path.stat().st_size),
+            "dimensions": tuple(int(d) for d in dimensions),  # Convert to tuple of ints
+            "blue_button_detected": bool(blue_button_info['detected']),
+            "blue_button_count": int(blue_button_info['count']),
+            "blue_button_details": str(blue_button_info['details']) if blue_button_info['details'] else "",
+            "blue_percentage": float(blue_button_info.get('blue_percentage', 0.0)),
+            "color_histogram": blue_button_info.get('color_histogram', []),
+            "content_hash": content_hash,
+            "description_source": description_source or self._description_source(openai=False)
+        }
+        
+        logger.info(f"Processed {file_path.name}: blue_button={blue_button_info['detected']}, count={blue_button_info['count']}")
+        
+        return screenshot_data
+    
+    def _extract_cpu_features(self, file_path: Path, include_ui_analysis: bool) -> Dict:
+        """CPU-bound ingestion stages (OCR and OpenCV detectors); safe to run in a worker process."""
+        frame = ImageFrame.load(file_path)
+        features = {
+            'file_path': str(file_path),
+            'content_hash': FeatureCache.hash_bytes(frame.raw_bytes),
+            'ocr_text': self._extract_ocr_text(frame),
+            'dimensions': frame.size,
+            'blue_button_info': self._detect_blue_buttons_enhanced(frame),
+            'ui_analysis': self._analyze_ui_elements(frame) if include_ui_analysis else None
+        }
+        
+        return features
+    
+    def _process_screenshots_parallel(self, screenshot_files: List[Path]) -> List[Dict]:
+        """Run OCR and OpenCV stages in a process pool, then the model-bound stages batched in this process."""
+        include_ui_analysis = not (self.use_openai and self.openai_client)
+        tasks = [(str(file_path), include_ui_analysis) for file_path in screenshot_files]
+        chunksize = max(1, len(tasks) // (self.ingest_workers * 4))
+        
+        logger.info(f"Running OCR and detection with {self.ingest_workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=self.ingest_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_ingest_worker,
+                                 initargs=(self._ingest_worker_settings(),)) as pool:
+            cpu_results = [result for result in pool.map(_ingest_worker, tasks, chunksize=chunksize) if result]
+        
+        # Model-bound stage: OpenAI descriptions where available, local captions in batches otherwise
+        descriptions = {}
+        if self.use_openai and self.openai_client:
+            descriptions = self._generate_openai_descriptions([features['file_path'] for features in cpu_results])
+        openai_described = set(descriptions)
+        needs_caption = [features for features in cpu_results if features['file_path'] not in descriptions]
+        
+        for start in range(0, len(needs_caption), CAPTION_BATCH_SIZE):
+            batch = needs_caption[start:start + CAPTION_BATCH_SIZE]
+            frames = [None] * len(batch)
+            try:
+                frames = [ImageFrame.load(features['file_path']) for features in batch]
+                images = [frame.to_pil(max_size=MAX_DESCRIPTION_IMAGE_SIZE) for frame in frames]
+                captions = self.vision_model(images, batch_size=len(images))
+            except Exception as e:
+                logger.error(f"Batched visual description failed: {e}")
+                captions = [None] * len(batch)
+            
+            for features, frame, caption in zip(batch, frames, captions):
+                if not caption:
+                    descriptions[features['file_path']] = "Unable to generate visual description"
+                    continue
+                base_description = caption[0]['generated_text']
+                if features['ui_analysis'] is None:
+                    # Worker skipped UI analysis because OpenAI was expected to describe this image
+                    descriptions[features['file_path']] = self._enhance_ui_description(frame, base_description).strip()
+                else:
+                    descriptions[features['file_path']] = self._compose_ui_description(base_description, features['ui_analysis']).strip()
+        
+        records = []
+        for features in cpu_results:
+            try:
+                records.append(self._build_screenshot_record(
+                    Path(features['file_path']),
+                    features['ocr_text'],
+                    descriptions.get(features['file_path'], ""),
+                    features['dimensions'],
+                    features['blue_button_info'],
+                    features['content_hash'],
+                    self._description_source(openai=features['file_path'] in openai_described)
+                ))
+            except Exception as e:
+                logger.error(f"Failed to process {features['file_path']}: {e}")
+        
+        return records
+    
+    def _ingest_worker_settings(self) -> Dict:
+        """Engine attributes the CPU stages read, copied onto each worker's bare engine."""
+        # Bands of one image share the worker's cores with the other worker processes
+        return {'ocr_mode': self.ocr_mode, 'analysis_scale': self.analysis_scale,
+                'ocr_tile_workers': max(1, OCR_TILE_WORKERS // self.ingest_workers)}
+    
+    def _extract_ocr_text(self, frame: ImageFrame) -> str:
         """Extract text from image using OCR."""
         try:
-            # Convert PIL image to OpenCV format for better OCR
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Preprocess image for better OCR
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
-            thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-            
-            # Extract text
-            text = pytesseract.image_to_string(thresh)
+            # Otsu-thresholded gray plane for better OCR
+            if self.ocr_mode == 'tiled':
+                height, width = frame.otsu.shape[:2]
+                bands = self._ocr_bands(height, width)
+                if len(bands) > 1:
+                    return self._extract_ocr_text_tiled(frame.otsu, bands)
+            
+            text = pytesseract.image_to_string(frame.otsu)
             return text.strip()
             
         except Exception as e:
             logger.error(f"OCR extraction failed: {e}")
             return ""
     
-    def _generate_visual_description(self, image_path: str, image: Image.Image) -> str:
-        """Generate visual description of image using AI model."""
+    @staticmethod
+    def _ocr_bands(height: int, width: int) -> List[Tuple[int, int, int, int]]:
+        """Overlapping horizontal bands as (start, end, owned start, owned end) rows.
+        
+        Owned ranges partition the image; each band extends OCR_TILE_OVERLAP / 2 rows past
+        them so a text line cut at one band's edge is read whole by its neighbour.
+        """
+        if height * width < OCR_TILE_MIN_PIXELS:
+            return [(0, height, 0, height)]
+        count = math.ceil(height * width / OCR_TILE_TARGET_PIXELS)
+        count = max(1, min(count, height // (2 * OCR_TILE_OVERLAP)))
+        step = math.ceil(height / count)
+        half_overlap = OCR_TILE_OVERLAP // 2
+        return [
+            (max(0, i * step - half_overlap), min(height, (i + 1) * step + half_overlap), i * step, min(height, (i + 1) * step))
+            for i in range(count)
+        ]
+    
+    def _extract_ocr_text_tiled(self, image: np.ndarray, bands: List[Tuple[int, int, int, int]]) -> str:
+        """OCR bands in parallel and merge their lines, de-duplicating text read twice at the seams."""
+        def ocr_band(band: Tuple[int, int, int, int]) -> List[str]:
+            start, end, owned_start, owned_end = band
+            data = pytesseract.image_to_data(image[start:end], output_type=pytesseract.Output.DICT)
+            
+            # Group words into Tesseract's lines, keeping its reading order
+            lines = OrderedDict()
+            for i, word in enumerate(data['text']):
+                if not word.strip() or float(data['conf'][i]) < 0:
+                    continue
+                key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                top = start + data['top'][i]
+                line = lines.setdefault(key, {'words': [], 'top': top, 'bottom': top + data['height'][i]})
+                line['words'].append(word)
+                line['top'] = min(line['top'], top)
+                line['bottom'] = max(line['bottom'], top + data['height'][i])
+            
+            # A line belongs to the band whose owned rows contain its vertical centre
+            return [
+                " ".join(line['words']) for line in lines.values()
+                if owned_start <= (line['top'] + line['bottom']) / 2 < owned_end
+            ]
+        
+        workers = min(len(bands), getattr(self, 'ocr_tile_workers', OCR_TILE_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            band_lines = list(pool.map(ocr_band, bands))
+        
+        merged = []
+        for lines in band_lines:
+            # Boxes can shift a line's centre across the seam; drop an exact repeat of the previous line
+            if merged and lines and lines[0] == merged[-1]:
+                lines = lines[1:]
+            merged.extend(lines)
+        return "\n".join(merged).strip()
+    
+    def _generate_visual_description(self, frame: ImageFrame, allow_openai: bool = True) -> Tuple[str, str]:
+        """Generate visual description of image using AI model; returns (description, description source)."""
         try:
-            # Resize image if too large for model
-            max_size = 2048  # OpenAI supports larger images
-            if max(image.size) > max_size:
-                ratio = max_size / max(image.size)
-                new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-            
             # Try OpenAI first if available
-            if self.use_openai and self.openai_client:
+            if allow_openai and self.use_openai and self.openai_client:
                 try:
-                    description = self._generate_openai_description(image_path, image)
+                    description = self._generate_openai_description(frame)
                     if description:
-                        return description
+                        return description, self._description_source(openai=True)
                 except Exception as e:
                     logger.warning(f"OpenAI description failed, falling back to local model: {e}")
             
-            # Fallback to local model
-            result = self.vision_model(image)
+            # Fallback to local model, resizing the image if too large for it
+            result = self.vision_model(frame.to_pil(max_size=MAX_DESCRIPTION_IMAGE_SIZE))
             description = result[0]['generated_text']
             
             # Enhance description with UI element detection
-            enhanced_description = self._enhance_ui_description(image_path, description)
+            enhanced_description = self._enhance_ui_description(frame, description)
             
-            return enhanced_description.strip()
+            return enhanced_description.strip(), self._description_source(openai=False)
             
         except Exception as e:
             logger.error(f"Visual description generation failed: {e}")
-            return "Unable to generate visual description"
+            return "Unable to generate visual description", self._description_source(openai=False)
     
-    def _generate_openai_description(self, image_path: str, image: Image.Image) -> str:
+    def _generate_openai_descriptions(self, file_paths: List) -> Dict[str, str]:
+        """Describe many screenshots with up to openai_concurrency requests in flight.
+        
+        Each request makes a single attempt; failures are rescheduled with exponential backoff
+        instead of sleeping in a worker, so a retry never holds a slot other images could use.
+        Throughput is bounded by the shared rate limiter. Returns file path -> description for
+        the images that succeeded; the rest are left to the local captioner.
+        """
+        if not file_paths:
+            return {}
+        
+        def describe(file_path: str) -> str:
+            description = self._generate_openai_description(ImageFrame.load(file_path), max_retries=1)
+            if not description:
+                raise RuntimeError("empty description")
+            return description
+        
+        descriptions = {}
+        pending = [(str(file_path), 0) for file_path in reversed(file_paths)]  # Popped from the end, in order
+        delayed = []  # Heap of (ready time, sequence, path, attempt)
+        sequence = 0
+        start = time.time()
+        logger.info(f"Requesting {len(file_paths)} OpenAI descriptions with {self.openai_concurrency} in flight...")
+        
+        with ThreadPoolExecutor(max_workers=self.openai_concurrency) as pool:
+            in_flight = {}
+            while pending or delayed or in_flight:
+                now = time.time()
+                while delayed and delayed[0][0] <= now:
+                    _, _, file_path, attempt = heapq.heappop(delayed)
+                    pending.append((file_path, attempt))
+                while pending and len(in_flight) < self.openai_concurrency:
+                    file_path, attempt = pending.pop()
+                    in_flight[pool.submit(describe, file_path)] = (file_path, attempt)
+                
+                timeout = max(0.0, delayed[0][0] - now) if delayed else None
+                if not in_flight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, attempt = in_flight.pop(future)
+                    try:
+                        descriptions[file_path] = future.result()
+                    except Exception as e:
+                        if attempt + 1 < OPENAI_MAX_RETRIES:
+                            wait_time = OPENAI_RETRY_BASE_DELAY * 2 ** attempt
+                            logger.warning(f"OpenAI description for {Path(file_path).name} failed ({e}), retrying in {wait_time}s")
+                            sequence += 1
+                            heapq.heappush(delayed, (time.time() + wait_time, sequence, file_path, attempt + 1))
+                        else:
+                            logger.warning(f"OpenAI description for {Path(file_path).name} failed after {OPENAI_MAX_RETRIES} attempts, falling back to local model")
+        
+        elapsed = time.time() - start
+        logger.info(f"Generated {len(descriptions)}/{len(file_paths)} OpenAI descriptions in {elapsed:.1f}s "
+                    f"({len(descriptions) / max(elapsed, 1e-9) * 60:.1f}/min, {self.openai_limiter.waited:.1f}s rate-limited)")
+        return descriptions
+    
+    def _generate_openai_description(self, frame: ImageFrame, max_retries: int = OPENAI_MAX_RETRIES) -> str:
         """Generate detailed visual description using OpenAI GPT-4 Vision with maximum accuracy and limits."""
         try:
-            # Read and encode image
-            with open(image_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+            # Encode the bytes already read for this frame
+            base64_image = frame.to_base64()
             
             # Enhanced prompt for maximum accuracy and detail
             prompt = """
@@ -333,6 +2072,7 @@ class VisualMemorySearch:
             """
 
             response = self._call_openai_with_retry(
+                max_retries=max_retries,
                 messages=[
                     {
                         "role": "user",
@@ -365,70 +2105,76 @@ class VisualMemorySearch:
             logger.error(f"OpenAI description generation failed: {e}")
             return None
     
-    def _enhance_ui_description(self, image_path: str, base_description: str) -> str:
+    def _enhance_ui_description(self, frame: ImageFrame, base_description: str) -> str:
         """Enhance visual description with OpenCV-based UI element detection and semantic analysis."""
         try:
-            # Read image for OpenCV processing
-            image = cv2.imread(image_path)
-            if image is None:
-                return base_description
-            
-            enhanced_parts = [base_description]
-            
-            # Extract semantic tags and categories
-            semantic_tags = self._extract_semantic_tags(base_description)
-            if semantic_tags:
-                enhanced_parts.append(f"Semantic tags: {', '.join(semantic_tags)}")
-            
-            # Detect UI patterns
-            ui_patterns = self._detect_ui_patterns(image)
-            if ui_patterns:
-                enhanced_parts.append(f"UI patterns: {', '.join(ui_patterns)}")
-            
-            # Detect buttons and interactive elements
-            buttons = self._detect_buttons(image)
-            if buttons:
-                enhanced_parts.append(f"Interactive elements: {len(buttons)} buttons detected")
-            
-            # Detect dominant colors
-            colors = self._detect_dominant_colors(image)
-            if colors:
-                enhanced_parts.append(f"Dominant colors: {', '.join(colors)}")
-            
-            # Detect layout structure
-            layout = self._detect_layout_structure(image)
-            if layout:
-                enhanced_parts.append(f"Layout: {layout}")
-            
-            # Detect content types
-            content_types = self._detect_content_types(image)
-            if content_types:
-                enhanced_parts.append(f"Content types: {', '.join(content_types)}")
-            
-            return " | ".join(enhanced_parts)
+            return self._compose_ui_description(base_description, self._analyze_ui_elements(frame))
             
         except Exception as e:
             logger.error(f"UI enhancement failed: {e}")
             return base_description
     
+    def _analyze_ui_elements(self, frame: ImageFrame) -> Dict:
+        """Structured UI analysis used to enrich local captions.
+        
+        Detectors run on the reduced-resolution analysis frame and read its shared contour set
+        (one Canny map, one findContours); buttons are dicts with bbox (original coordinates),
+        confidence and blue_percentage.
+        """
+        analysis = self._analysis_frame(frame)
+        return {
+            'ui_patterns': self._detect_ui_patterns(analysis),
+            'buttons': self._detect_buttons_enhanced(analysis),
+            'colors': self._detect_dominant_colors(analysis),
+            'layout': self._detect_layout_structure(frame),
+            'content_types': self._detect_content_types(analysis)
+        }
+    
+    def _analysis_frame(self, frame: ImageFrame) -> ImageFrame:
+        """Copy of the frame the OpenCV detectors run on: high-DPI captures reduced to logical pixels,
+        capped at ANALYSIS_MAX_SIDE, then scaled by analysis_scale."""
+        dpi_scale = 1.0 / frame.pixel_density
+        cap_scale = min(1.0, ANALYSIS_MAX_SIDE / (max(frame.size) * dpi_scale))
+        return frame.analysis_copy(self.analysis_scale * dpi_scale * cap_scale, self.analysis_scale * cap_scale)
+    
+    def _compose_ui_description(self, base_description: str, ui_analysis: Dict) -> str:
+        """Append semantic tags and detected UI elements to a base description."""
+        enhanced_parts = [base_description]
+        
+        # Extract semantic tags and categories
+        semantic_tags = self._extract_semantic_tags(base_description)
+        if semantic_tags:
+            enhanced_parts.append(f"Semantic tags: {', '.join(semantic_tags)}")
+        
+        # Detect UI patterns
+        if ui_analysis['ui_patterns']:
+            enhanced_parts.append(f"UI patterns: {', '.join(ui_analysis['ui_patterns'])}")
+        
+        # Detect buttons and interactive elements
+        if ui_analysis['buttons']:
+            enhanced_parts.append(f"Interactive elements: {len(ui_analysis['buttons'])} buttons detected")
+        
+        # Detect dominant colors
+        if ui_analysis['colors']:
+            enhanced_parts.append(f"Dominant colors: {', '.join(ui_analysis['colors'])}")
+        
+        # Detect layout structure
+        if ui_analysis['layout']:
+            enhanced_parts.append(f"Layout: {ui_analysis['layout']}")
+        
+        # Detect content types
+        if ui_analysis['content_types']:
+            enhanced_parts.append(f"Content types: {', '.join(ui_analysis['content_types'])}")
+        
+        return " | ".join(enhanced_parts)
+    
     def _extract_semantic_tags(self, description: str) -> List[str]:
         """Extract semantic tags from OpenAI description."""
         tags = []
         description_lower = description.lower()
         
         # Category tags
-        categories = {
-            'e-commerce': ['shopping', 'cart', 'product', 'store', 'buy', 'purchase'],
-            'social media': ['social', 'post', 'feed', 'profile', 'friend', 'share'],
-            'productivity': ['dashboard', 'analytics', 'chart', 'report', 'data', 'metrics'],
-            'communication': ['email', 'chat', 'message', 'inbox', 'compose'],
-            'gaming': ['game', 'player', 'score', 'level', 'inventory', 'health'],
-            'weather': ['weather', 'temperature', 'forecast', 'climate', 'sunny', 'rainy'],
-            'authentication': ['login', 'signin', 'password', 'auth', 'security'],
-            'error': ['error', '404', 'unauthorized', 'failed', 'warning']
-        }
-        
-        for category, keywords in categories.items():
+        for category, keywords in SEMANTIC_TAG_CATEGORIES.items():
             if any(keyword in description_lower for keyword in keywords):
                 tags.append(category)
         
@@ -446,29 +2192,21 @@ class VisualMemorySearch:
         
         return list(set(tags))  # Remove duplicates
     
-    def _detect_ui_patterns(self, image: np.ndarray) -> List[str]:
+    def _detect_ui_patterns(self, frame: ImageFrame) -> List[str]:
         """Detect common UI patterns in the image."""
         patterns = []
         
-        # Convert to grayscale for pattern detection
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = frame.gray
+        contour_set = frame.ui_contours
         
-        # Detect grid patterns
-        edges = cv2.Canny(gray, 50, 150)
-        lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=100)
-        if lines is not None and len(lines) > 10:
+        # Detect grid patterns: long straight segments of the shared contours stand in for Hough lines
+        if contour_set.line_count > 10:
             patterns.append("grid layout")
         
-        # Detect card-like structures
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        card_count = 0
-        for contour in contours:
-            if cv2.contourArea(contour) > 1000:  # Minimum area for cards
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h
-                if 0.5 < aspect_ratio < 2.0:  # Card-like proportions
-                    card_count += 1
-        
+        # Detect card-like structures (minimum area 1000 reference pixels, card-like proportions)
+        area_scale = frame.threshold_scale ** 2
+        card_count = np.count_nonzero((contour_set.areas > 1000 * area_scale)
+                                      & (contour_set.aspect_ratios > 0.5) & (contour_set.aspect_ratios < 2.0))
         if card_count > 2:
             patterns.append("card-based layout")
         
@@ -484,9 +2222,9 @@ class VisualMemorySearch:
         
         return patterns
     
-    def _detect_layout_structure(self, image: np.ndarray) -> str:
+    def _detect_layout_structure(self, frame: ImageFrame) -> str:
         """Detect the overall layout structure of the interface."""
-        height, width = image.shape[:2]
+        width, height = frame.size
         
         # Analyze layout proportions
         if width > height * 1.5:
@@ -504,191 +2242,61 @@ class VisualMemorySearch:
         
         return layout
     
-    def _detect_content_types(self, image: np.ndarray) -> List[str]:
+    def _detect_content_types(self, frame: ImageFrame) -> List[str]:
         """Detect types of content in the image."""
         content_types = []
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
         # Detect text regions (high contrast areas)
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        text_contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        text_contours, _ = cv2.findContours(frame.otsu, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        text_area = sum(cv2.contourArea(c) for c in text_contours if cv2.contourArea(c) > 100)
-        total_area = image.shape[0] * image.shape[1]
+        text_areas = np.array([cv2.contourArea(c) for c in text_contours])
+        area_scale = frame.threshold_scale ** 2
+        text_area = text_areas[text_areas > 100 * area_scale].sum()
+        total_area = frame.gray.shape[0] * frame.gray.shape[1]
         
         if text_area / total_area > 0.3:
             content_types.append("text-heavy")
         
-        # Detect chart-like patterns (regular geometric shapes)
-        edges = cv2.Canny(gray, 50, 150)
-        chart_contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        chart_count = 0
-        for contour in chart_contours:
-            area = cv2.contourArea(contour)
-            if 100 < area < 10000:  # Chart-sized contours
-                chart_count += 1
-        
+        # Detect chart-like patterns (regular geometric shapes of chart size)
+        areas = frame.ui_contours.areas
+        chart_count = np.count_nonzero((areas > 100 * area_scale) & (areas < 10000 * area_scale))
         if chart_count > 2:
             content_types.append("data visualization")
         
         # Detect form-like structures
-        if self._detect_form_structure(image):
+        if self._detect_form_structure(frame):
             content_types.append("form interface")
         
         return content_types
     
-    def _detect_form_structure(self, image: np.ndarray) -> bool:
+    def _detect_form_structure(self, frame: ImageFrame) -> bool:
         """Detect if the image contains form-like structures."""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Look for rectangular input fields
-        edges = cv2.Canny(gray, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        form_elements = 0
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if 500 < area < 5000:  # Input field sized
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h
-                if 2 < aspect_ratio < 8:  # Wide rectangles like input fields
-                    form_elements += 1
+        # Look for rectangular input fields: input-field sized, wide rectangles
+        contour_set = frame.ui_contours
+        area_scale = frame.threshold_scale ** 2
+        form_elements = np.count_nonzero((contour_set.areas > 500 * area_scale) & (contour_set.areas < 5000 * area_scale)
+                                         & (contour_set.aspect_ratios > 2) & (contour_set.aspect_ratios < 8))
         
         return form_elements >= 2  # At least 2 form elements
     
-    def _detect_buttons(self, img_array: np.ndarray) -> List[str]:
-        """Detect button-like elements in the image with enhanced blue button detection."""
-        try:
-            buttons = []
-            
-            # Convert to different color spaces for better detection
-            hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            
-            # Enhanced edge detection for rectangular shapes
-            edges = cv2.Canny(gray, 30, 100)  # Lowered thresholds for better detection
-            
-            # Find contours with different methods
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            button_count = 0
-            blue_button_found = False
-            
-            for contour in contours:
-                # Approximate contour to polygon
-                epsilon = 0.02 * cv2.arcLength(contour, True)
-                approx = cv2.approxPolyDP(contour, epsilon, True)
-                
-                # Check if it's roughly rectangular (4-6 points)
-                if len(approx) >= 4 and len(approx) <= 6:
-                    # Get bounding rectangle
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # Check if it's button-sized (not too small, not too large)
-                    if 30 <= w <= 400 and 20 <= h <= 120:
-                        # Check if it's not just the image border
-                        img_h, img_w = img_array.shape[:2]
-                        if x > 5 and y > 5 and x + w < img_w - 5 and y + h < img_h - 5:
-                            
-                            # Check if this region contains blue (potential blue button)
-                            roi = hsv[y:y+h, x:x+w]
-                            blue_mask = cv2.inRange(roi, np.array([100, 60, 60]), np.array([130, 255, 255]))
-                            blue_pixels = cv2.countNonZero(blue_mask)
-                            roi_pixels = roi.shape[0] * roi.shape[1]
-                            blue_percentage = (blue_pixels / roi_pixels) * 100
-                            
-                            if blue_percentage > 20:  # Significant blue in this region
-                                buttons.append("blue button")
-                                blue_button_found = True
-                                logger.info(f"Blue button detected at ({x},{y}) with {blue_percentage:.1f}% blue pixels")
-                            else:
-                                buttons.append("button")
-                            
-                            button_count += 1
-                            
-                            # Limit to avoid too many detections
-                            if button_count >= 5:
-                                break
-            
-            # If no blue button found but buttons exist, check overall image for blue
-            if not blue_button_found and button_count > 0:
-                # Check if the image has significant blue content
-                blue_mask = cv2.inRange(hsv, np.array([100, 60, 60]), np.array([130, 255, 255]))
-                blue_pixels = cv2.countNonZero(blue_mask)
-                total_pixels = hsv.shape[0] * hsv.shape[1]
-                blue_percentage = (blue_pixels / total_pixels) * 100
-                
-                if blue_percentage > 5:  # If image has blue content and buttons
-                    buttons = ["blue button"] + [btn for btn in buttons if btn != "blue button"]
-                    logger.info(f"Image has {blue_percentage:.1f}% blue content with buttons")
-            
-            return buttons
-            
-        except Exception as e:
-            logger.error(f"Button detection failed: {e}")
-            return []
-    
-    def _detect_dominant_colors(self, img_array: np.ndarray) -> List[str]:
+    def _detect_dominant_colors(self, frame: ImageFrame) -> List[str]:
         """Detect dominant colors in the image with enhanced accuracy for blue button detection."""
         try:
             colors = []
             
-            # Convert to HSV for better color detection
-            hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
-            
-            # Enhanced blue detection with multiple ranges for better accuracy
-            blue_ranges = [
-                ([100, 80, 80], [130, 255, 255]),      # Standard blue
-                ([110, 70, 70], [140, 255, 255]),      # Lighter blue
-                ([90, 90, 90], [120, 255, 255]),       # Darker blue
-                ([100, 60, 60], [130, 255, 200]),      # Desaturated blue
-                # Extended ranges for better coverage
-                ([95, 50, 50], [135, 255, 255]),       # Wider blue range
-                ([105, 40, 40], [125, 255, 180]),      # Lower saturation threshold
-            ]
-            
-            # Check blue with multiple ranges and lower threshold
-            blue_pixels_total = 0
-            total_pixels = hsv.shape[0] * hsv.shape[1]
-            
-            for lower, upper in blue_ranges:
-                lower = np.array(lower)
-                upper = np.array(upper)
-                mask = cv2.inRange(hsv, lower, upper)
-                blue_pixels = cv2.countNonZero(mask)
-                blue_pixels_total += blue_pixels
-            
-            # Calculate blue percentage and add if significant
-            blue_percentage = (blue_pixels_total / total_pixels) * 100
-            if blue_percentage > 3:  # Lowered threshold for blue detection
-                colors.append("blue color")
-                logger.info(f"Blue detected: {blue_percentage:.1f}% of pixels")
-            
-            # Other color ranges with enhanced detection
-            color_ranges = {
-                'red': ([0, 80, 80], [10, 255, 255]),          # Enhanced red
-                'green': ([40, 80, 80], [80, 255, 255]),        # Enhanced green
-                'yellow': ([20, 80, 80], [40, 255, 255]),       # Enhanced yellow
-                'purple': ([130, 80, 80], [160, 255, 255]),     # Enhanced purple
-                'orange': ([10, 80, 80], [20, 255, 255])        # Enhanced orange
-            }
-            
-            for color_name, (lower, upper) in color_ranges.items():
-                lower = np.array(lower)
-                upper = np.array(upper)
-                mask = cv2.inRange(hsv, lower, upper)
-                color_pixels = cv2.countNonZero(mask)
-                color_percentage = (color_pixels / total_pixels) * 100
-                
-                if color_percentage > 5:  # Lowered threshold for better detection
-                    colors.append(f"{color_name} color")
+            # One quantized HSV histogram answers every color range; overlapping blue ranges count each pixel once.
+            # It is built from the BGR frame: the original detectors fed cv2's BGR data to COLOR_RGB2HSV, which
+            # swapped red and blue hues, so blue UI used to be tagged "orange color"
+            histogram = frame.color_histogram
+            for color in COLOR_PROFILE_COLORS:
+                color_percentage = COLOR_QUANTIZER.percentage(histogram, color)
+                if color_percentage > DOMINANT_COLOR_THRESHOLDS[color]:
+                    colors.append(f"{color} color")
+                    if color == 'blue':
+                        logger.info(f"Blue detected: {color_percentage:.1f}% of pixels")
             
             # Special case: detect dark/light themes
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            avg_brightness = np.mean(gray)
+            avg_brightness = np.mean(frame.gray)
             
             if avg_brightness < 100:
                 colors.append("dark theme")
@@ -706,54 +2314,335 @@ class VisualMemorySearch:
         if not self.screenshots_data:
             return
         
-        # Create text embeddings for search
+        # Generate embeddings, reusing cached ones for unchanged content
+        self.index = EmbeddingMatrix.from_embeddings(self._embed_records(self.screenshots_data))
+        self._build_ann_index()
+        
+        self._feature_matrix = None
+        self._ensure_features()
+        self.ocr_index = OCRInvertedIndex()
+        self._ensure_ocr_index()
+    
+    def _ensure_ocr_index(self):
+        """Add OCR text of screenshots not yet in the inverted index."""
+        if len(self.ocr_index) > len(self.screenshots_data):
+            self.ocr_index = OCRInvertedIndex()
+        for data in self.screenshots_data[len(self.ocr_index):]:
+            self.ocr_index.add_document(data.get('ocr_text', ''))
+    
+    def _compute_feature_row(self, data: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute the boost feature flags and numeric columns for one screenshot."""
+        desc_lower = str(data.get('visual_description') or '').lower()
+        ocr_words = set(str(data.get('ocr_text') or '').lower().split())
+        
+        flags = np.zeros(len(FEATURE_COLUMNS), dtype=np.uint8)
+        for term in FEATURE_DESC_TERMS:
+            if term in desc_lower:
+                flags[FEATURE_INDEX[f"desc:{term}"]] = 1
+        for category, keywords in SEMANTIC_TAG_CATEGORIES.items():
+            if any(keyword in desc_lower for keyword in keywords):
+                flags[FEATURE_INDEX[f"tag:{category}"]] = 1
+        for group, synonyms in SEMANTIC_GROUPS.items():
+            if any(word in ocr_words for word in [group] + synonyms):
+                flags[FEATURE_INDEX[f"ocr:{group}"]] = 1
+        
+        # Color percentages come from the stored quantized histogram, not the pixels
+        color_percentages = COLOR_QUANTIZER.sparse_percentages(data.get('color_histogram') or [], COLOR_PROFILE_COLORS)
+        numeric = np.array([
+            float(bool(data.get('blue_button_detected'))),
+            float(data.get('blue_button_count', 0) or 0),
+            float(data.get('blue_percentage', 0) or 0)
+        ] + color_percentages, dtype=np.float32)
+        
+        return flags, numeric
+    
+    def _ensure_features(self):
+        """Compute feature rows for screenshots that do not have one yet."""
+        total = len(self.screenshots_data)
+        computed = 0 if self._feature_matrix is None else len(self._feature_matrix)
+        if computed > total:
+            self._feature_matrix = None
+            computed = 0
+        if computed == total and self._feature_matrix is not None:
+            return
+        
+        rows = [self._compute_feature_row(data) for data in self.screenshots_data[computed:]]
+        new_flags = np.array([flags for flags, _ in rows], dtype=np.uint8).reshape(-1, len(FEATURE_COLUMNS))
+        new_numeric = np.array([numeric for _, numeric in rows], dtype=np.float32).reshape(-1, len(NUMERIC_FEATURE_COLUMNS))
+        
+        if self._feature_matrix is None:
+            self._feature_matrix = new_flags
+            self._numeric_features = new_numeric
+        else:
+            self._feature_matrix = np.vstack([self._feature_matrix, new_flags])
+            self._numeric_features = np.vstack([self._numeric_features, new_numeric])
+    
+    def _feature(self, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean column of the feature matrix for every indexed screenshot, or only the given rows."""
+        self._ensure_features()
+        column = FEATURE_INDEX[name]
+        return (self._feature_matrix[:, column] if rows is None else self._feature_matrix[rows, column]).astype(bool)
+    
+    def _numeric_feature(self, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Numeric feature column for every indexed screenshot, or only the given rows."""
+        self._ensure_features()
+        column = NUMERIC_FEATURE_COLUMNS.index(name)
+        return self._numeric_features[:, column] if rows is None else self._numeric_features[rows, column]
+    
+    def _embed_records(self, records: List[Dict]) -> np.ndarray:
+        """Embedding matrix for records, taking cached rows by content hash and batch-encoding the rest."""
+        rows = [None] * len(records)
         texts = []
-        for data in self.screenshots_data:
+        positions = []
+        for i, data in enumerate(records):
             # Combine OCR text and visual description for search
             combined_text = f"{data['ocr_text']} {data['visual_description']}"
-            texts.append(combined_text)
+            content_hash = data.get('content_hash')
+            cached = self.feature_cache.get_embedding(content_hash, EMBEDDING_MODEL_NAME, combined_text) if content_hash else None
+            if cached is not None:
+                rows[i] = cached
+            else:
+                texts.append(combined_text)
+                positions.append(i)
+        
+        if texts:
+            encoded = np.asarray(self.embedding_model.encode(texts), dtype=np.float32)
+            for position, text, embedding in zip(positions, texts, encoded):
+                rows[position] = embedding
+                content_hash = records[position].get('content_hash')
+                if content_hash:
+                    self.feature_cache.put_embedding(content_hash, EMBEDDING_MODEL_NAME, text, embedding)
+        
+        logger.info(f"Embeddings: {len(records) - len(texts)} from cache, {len(texts)} encoded")
+        return np.asarray(rows, dtype=np.float32)
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Return an L2-normalized float32 copy of a 2-D embedding matrix."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0  # Leave all-zero rows at zero similarity
+        return matrix / norms
+    
+    def _ensure_embeddings(self):
+        """Encode any screenshots that have no embedding row yet, in a single batch."""
+        indexed_count = 0 if self.index is None else len(self.index)
+        
+        if indexed_count < len(self.screenshots_data):
+            missing = self.screenshots_data[indexed_count:]
+            new_rows = self._normalize_rows(self._embed_records(missing))
+            
+            if self.index is None:
+                self.index = EmbeddingMatrix(dimension=new_rows.shape[1])
+            self.index.append(new_rows)
+            
+            if self.ann_index is not None and self.ann_index.ntotal == indexed_count:
+                self.ann_index.add(new_rows)
+            else:
+                self.ann_index = None  # Rebuilt on the next ANN search
+            
+            logger.info(f"Generated embeddings for {len(missing)} screenshots missing from the index")
+    
+    def _score_embeddings(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every indexed screenshot in one matrix-vector product."""
+        self._ensure_embeddings()
+        if self.index is None or len(self.index) == 0:
+            return np.zeros(len(self.screenshots_data), dtype=np.float32)
+        
+        query_vector = self._normalize_rows(query_embedding)[0]
+        return self.index.matmul(query_vector)[:len(self.screenshots_data)]
+    
+    def _score_embeddings_many(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """(N, m) cosine similarities of m queries against every indexed screenshot in one matrix-matrix product."""
+        self._ensure_embeddings()
+        if self.index is None or len(self.index) == 0:
+            return np.zeros((len(self.screenshots_data), len(query_embeddings)), dtype=np.float32)
+        
+        query_vectors = self._normalize_rows(query_embeddings)
+        return self.index.matmul(np.ascontiguousarray(query_vectors.T))[:len(self.screenshots_data)]
+    
+    def _create_ann_index(self, dimension: int, count: int):
+        """Create an empty FAISS inner-product index of the configured type."""
+        if self.ann_index_type == 'hnsw':
+            index = faiss.index_factory(dimension, f"HNSW{ANN_HNSW_M},Flat", faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = ANN_HNSW_EF_SEARCH
+        elif self.ann_index_type == 'ivf':
+            # Roughly 4 * sqrt(N) inverted lists, keeping >= 39 training vectors per list
+            nlist = max(1, min(count // 39, int(4 * np.sqrt(count))))
+            index = faiss.index_factory(dimension, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = min(nlist, ANN_IVF_NPROBE)
+        else:
+            index = faiss.index_factory(dimension, "Flat", faiss.METRIC_INNER_PRODUCT)
+        return index
+    
+    def _build_ann_index(self):
+        """Build the FAISS index over the normalized embedding matrix (inner product == cosine)."""
+        if self.index is None or len(self.index) == 0:
+            self.ann_index = None
+            return
         
-        # Generate embeddings
-        embeddings = self.embedding_model.encode(texts)
-        self.index = embeddings
+        try:
+            vectors = np.ascontiguousarray(self.index.rows(), dtype=np.float32)
+            index = self._create_ann_index(vectors.shape[1], len(vectors))
+            if not index.is_trained:
+                index.train(vectors)
+            index.add(vectors)
+            self.ann_index = index
+            logger.info(f"Built {self.ann_index_type} ANN index with {index.ntotal} vectors")
+        except Exception as e:
+            logger.error(f"Failed to build ANN index: {e}")
+            self.ann_index = None
+    
+    def _embedding_fingerprint(self, count: int) -> str:
+        """Hash of the first count embedding rows, sampled at ANN_FINGERPRINT_ROWS evenly spaced positions."""
+        digest = hashlib.sha1(f"{count}:{self.index.dimension}".encode('utf-8'))
+        if count > 0:
+            for i in np.unique(np.linspace(0, count - 1, min(count, ANN_FINGERPRINT_ROWS)).astype(np.int64)):
+                digest.update(np.ascontiguousarray(self.index.row(int(i)), dtype=np.float32).tobytes())
+        return digest.hexdigest()[:16]
+    
+    def _ann_file_matches(self, index) -> bool:
+        """Whether a saved FAISS index was built from the current embedding rows."""
+        try:
+            with open(self.ann_meta_file, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (meta.get('ntotal') == index.ntotal <= len(self.index)
+                and meta.get('fingerprint') == self._embedding_fingerprint(index.ntotal))
+    
+    def _load_ann_index(self):
+        """Load the persisted FAISS index, rebuilding it if missing or built from other embeddings."""
+        self.ann_index = None
+        if self.index is None:
+            return
+        
+        if self.ann_index_file.exists():
+            try:
+                index = faiss.read_index(str(self.ann_index_file))
+                if self._ann_file_matches(index):
+                    # Rows appended through the journal since the index was last written
+                    if index.ntotal < len(self.index):
+                        index.add(np.ascontiguousarray(self.index.rows(index.ntotal)))
+                    if self.ann_index_type == 'hnsw':
+                        index.hnsw.efSearch = ANN_HNSW_EF_SEARCH
+                    elif self.ann_index_type == 'ivf':
+                        faiss.extract_index_ivf(index).nprobe = ANN_IVF_NPROBE
+                    self.ann_index = index
+                    logger.info(f"Loaded {self.ann_index_type} ANN index with {index.ntotal} vectors")
+                    return
+                logger.info("ANN index does not match the current embeddings, rebuilding...")
+            except Exception as e:
+                logger.warning(f"Failed to load ANN index, rebuilding: {e}")
+        
+        self._build_ann_index()
+        self._save_ann_index()
+    
+    def _save_ann_index(self):
+        """Persist the FAISS index next to embeddings.npy, with the fingerprint of the rows it holds."""
+        if self.ann_index is None:
+            return
+        try:
+            faiss.write_index(self.ann_index, str(self.ann_index_file))
+            with open(self.ann_meta_file, 'w') as f:
+                json.dump({'ntotal': int(self.ann_index.ntotal),
+                           'fingerprint': self._embedding_fingerprint(self.ann_index.ntotal)}, f)
+        except Exception as e:
+            logger.error(f"Failed to save ANN index: {e}")
+    
+    def _remove_ann_files(self):
+        """Delete the saved FAISS indexes of every type; they describe embeddings being replaced."""
+        for path in self.screenshot_dir.glob("faiss_*.index*"):
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to remove {path.name}: {e}")
+    
+    def _ann_search(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices, similarities) of the k nearest screenshots from the ANN index."""
+        return self._ann_search_many(np.atleast_2d(query_embedding), k)[0]
+    
+    def _ann_search_many(self, query_embeddings: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(indices, similarities) of the k nearest screenshots for each query row, in one FAISS call."""
+        self._ensure_embeddings()
+        if self.index is None or len(self.index) == 0:
+            return [(np.array([], dtype=np.int64), np.array([], dtype=np.float32))] * len(query_embeddings)
+        if self.ann_index is None:
+            self._load_ann_index()
+        if self.ann_index is None:
+            logger.warning("ANN index unavailable, falling back to exact scoring")
+            scores = self._score_embeddings_many(query_embeddings)
+            neighbours = []
+            for column in scores.T:
+                top_indices = self._top_k_indices(column, k)
+                neighbours.append((top_indices, column[top_indices]))
+            return neighbours
+        
+        query_vectors = self._normalize_rows(query_embeddings)
+        k = min(k, self.ann_index.ntotal)
+        distances, indices = self.ann_index.search(query_vectors, k)
+        
+        # FAISS pads with -1 when fewer than k neighbours are reachable
+        found = indices >= 0
+        return [(indices[i][found[i]].astype(np.int64), distances[i][found[i]]) for i in range(len(query_vectors))]
+    
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k highest scores, best first, using argpartition instead of a full sort."""
+        scores = np.asarray(scores)
+        if top_k <= 0 or len(scores) == 0:
+            return np.array([], dtype=np.int64)
+        if top_k >= len(scores):
+            return np.argsort(scores)[::-1]
+        
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[np.argsort(scores[candidates])[::-1]]
     
     def _save_index(self):
         """Save index to files."""
         try:
-            # Debug: Check each field for non-serializable types
-            logger.info("Checking screenshot data for JSON serialization...")
-            for i, data in enumerate(self.screenshots_data):
-                for key, value in data.items():
-                    try:
-                        # Test JSON serialization of this specific field
-                        json.dumps({key: value})
-                    except (TypeError, OverflowError) as e:
-                        logger.error(f"Field '{key}' in screenshot {i} ({data.get('filename', 'unknown')}) is not JSON serializable: {type(value)} = {value}")
-                        logger.error(f"Serialization error: {e}")
-                        # Try to convert common numpy types
-                        if hasattr(value, 'tolist'):  # numpy array
-                            data[key] = value.tolist()
-                            logger.info(f"Converted numpy array to list for field '{key}'")
-                        elif hasattr(value, 'item'):  # numpy scalar
-                            data[key] = value.item()
-                            logger.info(f"Converted numpy scalar to Python type for field '{key}'")
-                        else:
-                            # Convert to string as fallback
-                            data[key] = str(value)
-                            logger.info(f"Converted field '{key}' to string as fallback")
-            
-            # Save metadata
-            with open(self.index_file, 'w') as f:
-                json.dump(self.screenshots_data, f, indent=2)
+            # Save metadata with the derived feature matrix and OCR postings so loading needs no text
+            self._release_columnar_index()
+            self._ensure_features()
+            self._ensure_ocr_index()
+            ocr_arrays = self.ocr_index.to_arrays()
+            arrays = {
+                'feature_matrix': self._feature_matrix,
+                'numeric_features': self._numeric_features,
+                'ocr.posting_offsets': ocr_arrays['posting_offsets'],
+                'ocr.doc_ids': ocr_arrays['doc_ids'],
+                'ocr.frequencies': ocr_arrays['frequencies'],
+                'ocr.doc_lengths': ocr_arrays['doc_lengths']
+            }
+            strings = {
+                'feature_columns': "\n".join(FEATURE_COLUMNS),
+                'numeric_feature_columns': "\n".join(NUMERIC_FEATURE_COLUMNS),
+                'ocr.terms': ocr_arrays['terms'],
+                'ocr_mode': self.ocr_mode,
+                'analysis_scale': repr(self.analysis_scale)
+            }
+            ColumnarIndex.write(self.index_file, self.screenshots_data, arrays, strings)
+            if self.legacy_index_file.exists():
+                self.legacy_index_file.unlink()
             
-            # Save embeddings only if they exist
+            # Save embeddings only if they exist; other ANN types' files would hold the old rows
+            self._remove_ann_files()
             if self.index is not None:
-                np.save(self.embeddings_file, self.index)
+                self.index.save(self.embeddings_file, self.embedding_scales_file, self.embedding_dtype)
+                self._save_ann_index()
                 logger.info("Index and embeddings saved successfully")
             else:
                 logger.warning("No embeddings to save")
                 logger.info("Metadata index saved successfully")
             
+            # Everything journaled so far is now part of the full index files
+            if self.journal_file.exists():
+                self.journal_file.unlink()
+            self._journal_count = 0
+            self._refresh_index_version()
+            
         except Exception as e:
             logger.error(f"Failed to save index: {e}")
             # Log more details about the error
@@ -770,113 +2659,255 @@ class VisualMemorySearch:
             except Exception as debug_e:
                 logger.error(f"Debug logging failed: {debug_e}")
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict]:
-        """Search for screenshots using natural language query with enhanced semantic search and OpenAI validation."""
+    def search(self, query: str, top_k: int = 5, ann: bool = False) -> List[Dict]:
+        """Search for screenshots using natural language query with enhanced semantic search and OpenAI validation.
+        
+        With ann=True the dense stage queries the FAISS index for a candidate set
+        instead of scoring every screenshot; only those candidates can be returned.
+        """
         try:
-            if not self.screenshots_data:
-                logger.warning("No screenshots indexed. Use add_screenshot() first.")
-                return []
-            
-            # Enhanced query processing
-            enhanced_query = self._enhance_search_query(query)
-            semantic_query = self._extract_semantic_query(query)
-            
-            logger.info(f"Searching for: '{query}' (Enhanced: '{enhanced_query}')")
-            logger.info(f"Semantic context: {semantic_query}")
-            logger.info(f"Processing {len(self.screenshots_data)} images for maximum accuracy...")
-            
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([enhanced_query])[0]
-            
-            # Calculate similarities for ALL images
-            similarities = []
-            for i, data in enumerate(self.screenshots_data):
-                # Generate embedding if not present in the separate index
-                if i < len(self.index):
-                    similarity = cosine_similarity([query_embedding], [self.index[i]])[0][0]
-                else:
-                    # Generate embedding if not present
-                    combined_text = f"{data['ocr_text']} {data['visual_description']}"
-                    embedding = self.embedding_model.encode([combined_text])[0]
-                    # Store embedding in the separate index, not in screenshots_data
-                    if self.index is None:
-                        self.index = np.array([embedding])
-                    else:
-                        self.index = np.vstack([self.index, embedding])
-                    similarity = cosine_similarity([query_embedding], [embedding])[0][0]
-                    logger.info(f"Generated embedding for image {i+1}/{len(self.screenshots_data)}: {data['filename']}")
-                similarities.append(similarity)
-            
-            # Enhanced confidence scoring with semantic analysis for ALL images
-            boosted_similarities = self._boost_visual_matches(query, similarities)
-            semantic_boosted = self._apply_semantic_boost(query, semantic_query, boosted_similarities)
-            
-            # Get top 5 matches with enhanced accuracy
-            top_indices = np.argsort(semantic_boosted)[::-1][:top_k]
-            
-            logger.info(f"Top {len(top_indices)} results selected from {len(self.screenshots_data)} total images")
-            logger.info(f"Query: '{query}' - Enhanced: '{enhanced_query}'")
-            
-            # Log blue button detection for debugging
-            if 'blue' in query.lower() and 'button' in query.lower():
-                logger.info("Blue button query detected - applying enhanced detection...")
-                for i, data in enumerate(self.screenshots_data):
-                    if 'blue' in data['visual_description'].lower() and 'button' in data['visual_description'].lower():
-                        logger.info(f"Potential blue button found in: {data['filename']}")
-            
-            results = []
-            for idx in top_indices:
-                if semantic_boosted[idx] > 0:  # Only include relevant results
-                    result = {
-                        "filename": str(self.screenshots_data[idx]["filename"]),
-                        "file_path": str(self.screenshots_data[idx]["file_path"]),
-                        "confidence_score": float(semantic_boosted[idx]),
-                        "ocr_text": str(self.screenshots_data[idx]["ocr_text"])[:200] + "..." if len(str(self.screenshots_data[idx]["ocr_text"])) > 200 else str(self.screenshots_data[idx]["ocr_text"]),
-                        "visual_description": str(self.screenshots_data[idx]["visual_description"]),
-                        "dimensions": tuple(int(d) for d in self.screenshots_data[idx]["dimensions"]),
-                        "semantic_tags": list(self._extract_semantic_tags(self.screenshots_data[idx]["visual_description"])),
-                        "ui_patterns": list(self._extract_ui_patterns_from_description(self.screenshots_data[idx]["visual_description"])),
-                        "content_types": list(self._extract_content_types_from_description(self.screenshots_data[idx]["visual_description"])),
-                        "rank": int(len(results) + 1),  # Add ranking information
-                        "openai_score": None,  # Will be populated by validation
-                        "openai_explanation": None,
-                        "openai_tags": [],
-                        "openai_confidence": None,
-                        "visual_match_details": None,
-                        "content_alignment": None,
-                        "quality_indicators": None,
-                        "final_score": None  # Will be calculated after OpenAI validation
-                    }
-                    results.append(result)
-                    logger.info(f"Result {len(results)}: {result['filename']} (Score: {result['confidence_score']:.3f})")
-            
-            # Ensure exactly top 5 results
-            if len(results) > top_k:
-                results = results[:top_k]
-                logger.info(f"Truncated results to exactly {top_k} top results")
-            elif len(results) < top_k:
-                logger.warning(f"Only {len(results)} results found, expected {top_k}")
+            with self.profiler.stage('search'):
+                results = self._rank_results(query, top_k, ann)
+                if results:
+                    results = self._rerank_results(query, results, top_k)
+            return results
             
-            # Use OpenAI to validate and score ALL top 5 results with enhanced accuracy
-            if results:
-                logger.info(f"Validating {len(results)} results with OpenAI for maximum accuracy...")
-                results = self._validate_results_with_openai(query, results)
-                
-                # Sort by final score and ensure exactly top 5
-                results.sort(key=lambda x: x.get('final_score', x['confidence_score']), reverse=True)
-                results = results[:top_k]  # Ensure exactly top 5
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return []
+    
+    def search_many(self, queries: List[str], top_k: int = 5, ann: bool = False) -> List[List[Dict]]:
+        """Search for many queries at once; returns one result list per query, in input order.
+        
+        Query embeddings are encoded in one batch and scored against the corpus with one
+        matrix-matrix product per SEARCH_BATCH_QUERIES queries (or one batched FAISS search with
+        ann=True); boosts and OpenAI validation then run per query. Each list matches search().
+        """
+        all_results = [[] for _ in queries]
+        if not queries:
+            return all_results
+        if not self.screenshots_data:
+            logger.warning("No screenshots indexed. Use add_screenshot() first.")
+            return all_results
+        
+        try:
+            with self.profiler.stage('search_many'):
+                prepared = self._prepare_queries(queries)
+                for start in range(0, len(queries), SEARCH_BATCH_QUERIES):
+                    batch = range(start, min(start + SEARCH_BATCH_QUERIES, len(queries)))
+                    query_embeddings = np.stack([prepared[i][2] for i in batch])
+                    if ann:
+                        with self.profiler.stage('ann_search'):
+                            neighbours = self._ann_search_many(query_embeddings, self._candidate_count(top_k))
+                    else:
+                        with self.profiler.stage('similarity'):
+                            # Query-major copy so each query's boosts read one contiguous row
+                            similarities = np.ascontiguousarray(self._score_embeddings_many(query_embeddings).T)
+                    
+                    for column, i in enumerate(batch):
+                        _, semantic_query, _ = prepared[i]
+                        if ann:
+                            all_results[i] = self._rank_candidates(queries[i], semantic_query, *neighbours[column], top_k)
+                        else:
+                            all_results[i] = self._rank_similarities(queries[i], semantic_query, similarities[column], top_k)
                 
-                logger.info(f"Final top {len(results)} results with enhanced accuracy:")
-                for i, result in enumerate(results):
-                    final_score = result.get('final_score', result['confidence_score'])
-                    openai_score = result.get('openai_score', 'N/A')
-                    logger.info(f"  {i+1}. {result['filename']} - Final: {final_score:.3f}, OpenAI: {openai_score}")
+                validate = [i for i, results in enumerate(all_results) if results]
+                if self.use_openai and self.openai_client and len(validate) > 1:
+                    # Validation requests are independent per query; keep up to openai_concurrency in flight
+                    with ThreadPoolExecutor(max_workers=min(self.openai_concurrency, len(validate))) as pool:
+                        reranked = pool.map(lambda i: self._rerank_results(queries[i], all_results[i], top_k), validate)
+                        for i, results in zip(validate, reranked):
+                            all_results[i] = results
+                else:
+                    for i in validate:
+                        all_results[i] = self._rerank_results(queries[i], all_results[i], top_k)
             
-            return results
+            logger.info(f"Batch search: {len(queries)} queries over {len(self.screenshots_data)} images")
+            return all_results
             
         except Exception as e:
-            logger.error(f"Search failed: {e}")
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+    
+    def search_progressive(self, query: str, top_k: int = 5, ann: bool = False) -> Iterator[Dict]:
+        """Two-phase search: yields the local embedding and boost ranking as soon as it is scored,
+        then the OpenAI-validated rerank.
+        
+        Each event is {'phase': 'ranked' | 'validated', 'query', 'results', 'elapsed'} with elapsed
+        seconds since the call; search() returns the results of the final event.
+        """
+        start = time.perf_counter()
+        # End-to-end 'search' stage as in search(), so streamed requests show up in the latency percentiles
+        with self.profiler.stage('search'):
+            try:
+                with self.profiler.stage('rank_phase'):
+                    results = self._rank_results(query, top_k, ann)
+            except Exception as e:
+                logger.error(f"Search failed: {e}")
+                results = []
+            yield {'phase': 'ranked', 'query': query, 'results': results, 'elapsed': time.perf_counter() - start}
+            
+            if results:
+                try:
+                    # Validation fills result fields in place; keep the ranked event's dicts untouched
+                    results = self._rerank_results(query, [dict(result) for result in results], top_k)
+                except Exception as e:
+                    logger.error(f"Result validation failed, keeping the local ranking: {e}")
+            yield {'phase': 'validated', 'query': query, 'results': results, 'elapsed': time.perf_counter() - start}
+    
+    def _rank_results(self, query: str, top_k: int, ann: bool) -> List[Dict]:
+        """First search phase: embedding similarity plus visual and semantic boosts, no OpenAI calls."""
+        if not self.screenshots_data:
+            logger.warning("No screenshots indexed. Use add_screenshot() first.")
             return []
+        
+        # Enhanced query processing and embedding (cached for repeated queries)
+        enhanced_query, semantic_query, query_embedding = self._prepare_query(query)
+        
+        logger.info(f"Searching for: '{query}' (Enhanced: '{enhanced_query}')")
+        logger.info(f"Semantic context: {semantic_query}")
+        logger.info(f"Processing {len(self.screenshots_data)} images for maximum accuracy...")
+        
+        if ann:
+            # Approximate nearest neighbours
+            with self.profiler.stage('ann_search'):
+                candidate_ids, candidate_scores = self._ann_search(query_embedding, self._candidate_count(top_k))
+            return self._rank_candidates(query, semantic_query, candidate_ids, candidate_scores, top_k)
+        
+        # Calculate similarities for ALL images with one matrix-vector product
+        with self.profiler.stage('similarity'):
+            similarities = self._score_embeddings(query_embedding)
+        return self._rank_similarities(query, semantic_query, similarities, top_k)
+    
+    def _candidate_count(self, top_k: int) -> int:
+        """Dense candidates fetched from the ANN index before boosting."""
+        return max(top_k * 10, ANN_MIN_CANDIDATES, self.candidate_pool)
+    
+    def _rank_candidates(self, query: str, semantic_query: Dict, candidate_ids: np.ndarray,
+                         candidate_scores: np.ndarray, top_k: int) -> List[Dict]:
+        """Rank an ANN candidate set; boosts and their normalization see only the candidates."""
+        if len(candidate_ids) == 0:
+            return []
+        logger.info(f"ANN ({self.ann_index_type}) returned {len(candidate_ids)} candidates")
+        return self._rank_similarities(query, semantic_query, candidate_scores, top_k, candidate_ids)
+    
+    def _rank_similarities(self, query: str, semantic_query: Dict, similarities: np.ndarray, top_k: int,
+                           rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Apply the visual and semantic boosts to dense similarities and build the top_k result dicts.
+        
+        similarities covers every screenshot, or only the screenshot indices in rows. With
+        candidate_pool set, a full similarity vector is first cut to its top candidate_pool
+        rows (two-stage retrieval), so boosting costs O(pool) instead of O(corpus). The pool
+        keeps the corpus-wide normalization, so its scores match a full ranking exactly.
+        """
+        score_range = None
+        pool_size = max(self.candidate_pool, top_k)  # A pool smaller than top_k would truncate the results
+        if rows is None and self.candidate_pool > 0 and pool_size < len(similarities):
+            with self.profiler.stage('candidate_pool'):
+                score_range = (np.min(similarities), np.max(similarities))
+                rows = self._top_k_indices(similarities, pool_size)
+                similarities = similarities[rows]
+        
+        # Enhanced confidence scoring with semantic analysis for the ranked images
+        with self.profiler.stage('visual_boost'):
+            boosted_similarities = self._boost_visual_matches(query, similarities, rows, score_range)
+        with self.profiler.stage('semantic_boost'):
+            semantic_boosted = self._apply_semantic_boost(query, semantic_query, boosted_similarities, rows)
+        
+        # Get top 5 matches with enhanced accuracy
+        with self.profiler.stage('top_k'):
+            top_positions = self._top_k_indices(semantic_boosted, top_k)
+        
+        logger.info(f"Top {len(top_positions)} results selected from {len(semantic_boosted)} of {len(self.screenshots_data)} total images for '{query}'")
+        
+        # Log blue button detection for debugging
+        if 'blue' in query.lower() and 'button' in query.lower():
+            logger.info("Blue button query detected - applying enhanced detection...")
+            potential = np.count_nonzero(self._feature('desc:blue', rows) & self._feature('desc:button', rows))
+            logger.info(f"Potential blue buttons described in {potential} ranked screenshots")
+        
+        results = []
+        for position in top_positions:
+            idx = position if rows is None else rows[position]
+            if semantic_boosted[position] > 0:  # Only include relevant results
+                result = {
+                    "filename": str(self.screenshots_data[idx]["filename"]),
+                    "file_path": str(self.screenshots_data[idx]["file_path"]),
+                    "confidence_score": float(semantic_boosted[position]),
+                    "ocr_text": str(self.screenshots_data[idx]["ocr_text"])[:200] + "..." if len(str(self.screenshots_data[idx]["ocr_text"])) > 200 else str(self.screenshots_data[idx]["ocr_text"]),
+                    "visual_description": str(self.screenshots_data[idx]["visual_description"]),
+                    "dimensions": tuple(int(d) for d in self.screenshots_data[idx]["dimensions"]),
+                    "semantic_tags": list(self._extract_semantic_tags(self.screenshots_data[idx]["visual_description"])),
+                    "ui_patterns": list(self._extract_ui_patterns_from_description(self.screenshots_data[idx]["visual_description"])),
+                    "content_types": list(self._extract_content_types_from_description(self.screenshots_data[idx]["visual_description"])),
+                    "rank": int(len(results) + 1),  # Add ranking information
+                    "openai_score": None,  # Will be populated by validation
+                    "openai_explanation": None,
+                    "openai_tags": [],
+                    "openai_confidence": None,
+                    "visual_match_details": None,
+                    "content_alignment": None,
+                    "quality_indicators": None,
+                    "final_score": None  # Will be calculated after OpenAI validation
+                }
+                results.append(result)
+                logger.info(f"Result {len(results)}: {result['filename']} (Score: {result['confidence_score']:.3f})")
+        
+        # Ensure exactly top 5 results
+        if len(results) > top_k:
+            results = results[:top_k]
+            logger.info(f"Truncated results to exactly {top_k} top results")
+        elif len(results) < top_k:
+            logger.warning(f"Only {len(results)} results found, expected {top_k}")
+        
+        return results
+    
+    def _rerank_results(self, query: str, results: List[Dict], top_k: int) -> List[Dict]:
+        """Second search phase: OpenAI validation of the ranked results and the final ordering."""
+        # Use OpenAI to validate and score ALL top 5 results with enhanced accuracy
+        logger.info(f"Validating {len(results)} results with OpenAI for maximum accuracy...")
+        with self.profiler.stage('openai_validation'):
+            results = self._validate_results_with_openai(query, results)
+        
+        # Sort by final score and ensure exactly top 5
+        results.sort(key=lambda x: x.get('final_score', x['confidence_score']), reverse=True)
+        results = results[:top_k]  # Ensure exactly top 5
+        
+        logger.info(f"Final top {len(results)} results with enhanced accuracy:")
+        for i, result in enumerate(results):
+            final_score = result.get('final_score', result['confidence_score'])
+            openai_score = result.get('openai_score', 'N/A')
+            logger.info(f"  {i+1}. {result['filename']} - Final: {final_score:.3f}, OpenAI: {openai_score}")
+        
+        return results
+    
+    def _prepare_query(self, query: str) -> Tuple[str, Dict[str, List[str]], np.ndarray]:
+        """Return (enhanced query, semantic context, query embedding), reusing cached work for repeated queries."""
+        return self._prepare_queries([query])[0]
+    
+    def _prepare_queries(self, queries: List[str]) -> List[Tuple[str, Dict[str, List[str]], np.ndarray]]:
+        """_prepare_query for many queries, encoding every uncached query in a single batch."""
+        prepared = {}
+        for query in queries:
+            key = QueryCache.normalize(query)
+            if key in prepared:
+                continue
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                logger.info(f"Query cache hit for '{key}'")
+            prepared[key] = cached
+        
+        missing = [key for key, value in prepared.items() if value is None]
+        if missing:
+            with self.profiler.stage('query_enhance'):
+                contexts = [(self._enhance_search_query(key), self._extract_semantic_query(key)) for key in missing]
+            with self.profiler.stage('encode'):
+                query_embeddings = self.embedding_model.encode([enhanced_query for enhanced_query, _ in contexts])
+            for key, (enhanced_query, semantic_query), query_embedding in zip(missing, contexts, query_embeddings):
+                prepared[key] = (enhanced_query, semantic_query, query_embedding)
+                self.query_cache.put(key, prepared[key])
+        
+        return [prepared[QueryCache.normalize(query)] for query in queries]
     
     def _enhance_search_query(self, query: str) -> str:
         """Enhance search query for better visual search, especially for blue button queries."""
@@ -921,90 +2952,86 @@ class VisualMemorySearch:
         logger.info(f"Enhanced query: '{query}' -> '{enhanced}'")
         return enhanced
     
-    def _boost_visual_matches(self, query: str, similarities: np.ndarray) -> np.ndarray:
-        """Boost similarity scores for visual matches with enhanced accuracy for blue buttons."""
+    def _boost_visual_matches(self, query: str, similarities: np.ndarray, rows: Optional[np.ndarray] = None,
+                              score_range: Optional[Tuple[float, float]] = None) -> np.ndarray:
+        """Boost similarity scores for visual matches with enhanced accuracy for blue buttons.
+        
+        Description-based rules are evaluated as masks over the index-time feature matrix.
+        similarities covers every screenshot, or only the screenshot indices in rows;
+        score_range is the (min, max) to normalize by (default: that of similarities).
+        """
         query_lower = query.lower()
-        boosted = similarities.copy()
+        boosted = np.array(similarities, dtype=np.float64)
         
         # Normalize base similarities to 0-1 range
-        if np.max(boosted) > 0:
-            boosted = (boosted - np.min(boosted)) / (np.max(boosted) - np.min(boosted))
+        low, high = score_range if score_range is not None else (np.min(boosted), np.max(boosted))
+        if high > 0:
+            boosted = (boosted - low) / (high - low)
         
         # Special boost for blue button queries
         if 'blue' in query_lower and 'button' in query_lower:
             logger.info("Applying enhanced blue button boost...")
-            for i, data in enumerate(self.screenshots_data):
-                if data.get('blue_button_detected'):
-                    blue_count = data.get('blue_button_count', 0)
-                    blue_percentage = data.get('blue_percentage', 0)
-                    
-                    # Significant boost for confirmed blue buttons
-                    if blue_count > 0:
-                        boost_factor = 3.0 + (blue_count * 0.5)  # Base 3x + 0.5x per button
-                        boosted[i] *= boost_factor
-                        logger.info(f"Blue button boost applied to {data['filename']}: {boost_factor}x (count: {blue_count})")
-                    elif blue_percentage > 5:  # High blue content
-                        boosted[i] *= 2.5
-                        logger.info(f"High blue content boost applied to {data['filename']}: 2.5x ({blue_percentage:.1f}% blue)")
-        
-        # Enhanced color matching with more precise detection
-        if any(color in query_lower for color in ['blue', 'red', 'green', 'yellow', 'purple', 'orange', 'pink', 'brown', 'gray', 'black', 'white']):
-            for i, data in enumerate(self.screenshots_data):
-                if data['visual_description']:
-                    desc_lower = data['visual_description'].lower()
-                    # Check for exact color matches with higher boost
-                    for color in ['blue', 'red', 'green', 'yellow', 'purple', 'orange', 'pink', 'brown', 'gray', 'black', 'white']:
-                        if color in query_lower and color in desc_lower:
-                            # Special boost for blue button queries
-                            if color == 'blue' and 'button' in query_lower and 'button' in desc_lower:
-                                boosted[i] *= 3.0  # 200% boost for blue button matches
-                                logger.info(f"Blue button boost applied to {data['filename']}")
-                            else:
-                                boosted[i] *= 2.0  # 100% boost for exact color matches
-                            break
-                        elif color in query_lower and any(c in desc_lower for c in ['color', 'colored', 'theme', 'background']):
-                            boosted[i] *= 1.7  # Boost by 70% for color-related descriptions
+            detected = self._numeric_feature('blue_button_detected', rows) > 0
+            blue_count = self._numeric_feature('blue_button_count', rows)
+            blue_percentage = self._numeric_feature('blue_percentage', rows)
+            
+            # Base 3x + 0.5x per confirmed blue button, 2.5x for high blue content
+            boost_factor = np.where(blue_count > 0, 3.0 + blue_count * 0.5, np.where(blue_percentage > 5, 2.5, 1.0))
+            boosted *= np.where(detected, boost_factor, 1.0)
+            logger.info(f"Blue button boost applied to {np.count_nonzero(detected & (boost_factor > 1.0))} screenshots")
+        
+        # Enhanced color matching: the first query color found in a description wins;
+        # query colors checked before it boost color-related descriptions by 70%
+        query_colors = [color for color in BOOST_COLORS if color in query_lower]
+        if query_colors:
+            color_context = np.zeros(len(boosted), dtype=bool)
+            for term in COLOR_CONTEXT_TERMS:
+                color_context |= self._feature(f"desc:{term}", rows)
+            
+            unmatched = np.ones(len(boosted), dtype=bool)
+            for color in query_colors:
+                has_color = self._feature(f"desc:{color}", rows)
+                if color in DOMINANT_COLOR_THRESHOLDS:
+                    # Pixel evidence from the index-time color histogram, for descriptions that omit the color
+                    has_color = has_color | (self._numeric_feature(f"color:{color}", rows) > DOMINANT_COLOR_THRESHOLDS[color])
+                if color == 'blue' and 'button' in query_lower:
+                    match_boost = np.where(self._feature('desc:button', rows), 3.0, 2.0)  # 200% for blue button matches
+                else:
+                    match_boost = 2.0  # 100% boost for exact color matches
+                boosted *= np.where(unmatched & has_color, match_boost,
+                                    np.where(unmatched & color_context, 1.7, 1.0))
+                unmatched &= ~has_color
         
         # Enhanced button and UI element matching
-        ui_elements = ['button', 'form', 'input', 'field', 'menu', 'sidebar', 'header', 'navigation', 'modal', 'dialog', 'tooltip']
-        for element in ui_elements:
+        for element in UI_BOOST_ELEMENTS:
             if element in query_lower:
-                for i, data in enumerate(self.screenshots_data):
-                    if data['visual_description'] and element in data['visual_description'].lower():
-                        # Special boost for blue button queries
-                        if element == 'button' and 'blue' in query_lower and 'blue' in data['visual_description'].lower():
-                            boosted[i] *= 2.5  # 150% boost for blue button matches
-                            logger.info(f"Blue button UI boost applied to {data['filename']}")
-                        else:
-                            boosted[i] *= 1.8  # 80% boost for UI element matches
-        
-        # Enhanced text matching with semantic similarity
-        for i, data in enumerate(self.screenshots_data):
-            if data['ocr_text']:
-                ocr_lower = data['ocr_text'].lower()
-                query_words = query_lower.split()
-                
-                # Exact word matches
-                exact_matches = sum(1 for word in query_words if word in ocr_lower)
-                if exact_matches > 0:
-                    boost_factor = 1.0 + (exact_matches * 0.4)  # 40% boost per matching word
-                    boosted[i] *= boost_factor
-                
-                # Semantic word matches (synonyms, related terms)
-                semantic_matches = self._calculate_semantic_similarity(query_lower, ocr_lower)
-                if semantic_matches > 0.3:  # Threshold for semantic relevance
-                    boosted[i] *= (1.0 + semantic_matches * 0.5)  # Up to 50% boost for semantic matches
+                has_element = self._feature(f"desc:{element}", rows)
+                if element == 'button' and 'blue' in query_lower:
+                    element_boost = np.where(self._feature('desc:blue', rows), 2.5, 1.8)  # 150% for blue button matches
+                else:
+                    element_boost = 1.8  # 80% boost for UI element matches
+                boosted *= np.where(has_element, element_boost, 1.0)
+        
+        # Enhanced text matching: BM25 over the OCR inverted index touches only
+        # screenshots containing a query term
+        self._ensure_ocr_index()
+        doc_ids, bm25_scores, matched_terms = self.ocr_index.score(query_lower)
+        if len(doc_ids) > 0:
+            # 40% boost per matching word, scaled by BM25 relative to the best OCR match
+            relative_bm25 = bm25_scores / bm25_scores.max()
+            positions, found = self._row_positions(doc_ids, rows)
+            boosted[positions] *= 1.0 + (matched_terms[found] * 0.4 * relative_bm25[found])
+        
+        # Semantic word matches (synonyms, related terms) from index-time OCR group flags
+        semantic_matches = self._semantic_ocr_scores(query_lower, rows)
+        if semantic_matches is not None:
+            relevant = semantic_matches > 0.3  # Threshold for semantic relevance
+            boosted *= np.where(relevant, 1.0 + semantic_matches * 0.5, 1.0)  # Up to 50% boost
         
         # Enhanced layout and design matching
-        layout_terms = ['layout', 'design', 'interface', 'ui', 'ux', 'grid', 'card', 'sidebar', 'header', 'footer']
-        if any(term in query_lower for term in layout_terms):
-            for i, data in enumerate(self.screenshots_data):
-                if data['visual_description']:
-                    desc_lower = data['visual_description'].lower()
-                    layout_matches = sum(1 for term in layout_terms if term in desc_lower)
-                    if layout_matches > 0:
-                        boost_factor = 1.0 + (layout_matches * 0.3)  # 30% boost per layout match
-                        boosted[i] *= boost_factor
+        if any(term in query_lower for term in LAYOUT_TERMS):
+            layout_matches = sum(self._feature(f"desc:{term}", rows).astype(np.float64) for term in LAYOUT_TERMS)
+            boosted *= 1.0 + (layout_matches * 0.3)  # 30% boost per layout match
         
         # Ensure scores are in reasonable range (0.1 to 1.0)
         boosted = np.clip(boosted, 0.1, 1.0)
@@ -1014,20 +3041,35 @@ class VisualMemorySearch:
         
         return boosted
     
+    @staticmethod
+    def _row_positions(doc_ids: np.ndarray, rows: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions within rows of the screenshot indices doc_ids, and the mask of doc_ids found there."""
+        if rows is None:
+            return doc_ids, np.ones(len(doc_ids), dtype=bool)
+        order = np.argsort(rows)
+        slots = np.minimum(np.searchsorted(rows[order], doc_ids), len(rows) - 1)
+        found = rows[order][slots] == doc_ids
+        return order[slots[found]], found
+    
+    def _semantic_ocr_scores(self, query_lower: str, rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Vectorized _calculate_semantic_similarity of the query against every screenshot's OCR text (or only rows)."""
+        query_words = query_lower.split()
+        if not query_words:
+            return None
+        
+        scores = np.zeros(len(self.screenshots_data) if rows is None else len(rows), dtype=np.float64)
+        for word in query_words:
+            group = next((g for g, synonyms in SEMANTIC_GROUPS.items() if word in [g] + synonyms), None)
+            if group is not None:
+                scores += 0.8 * self._feature(f"ocr:{group}", rows)  # High semantic match
+        
+        return np.minimum(scores / len(query_words), 1.0)
+    
     def _calculate_semantic_similarity(self, query: str, text: str) -> float:
         """Calculate semantic similarity between query and text using word embeddings."""
         try:
             # Simple semantic matching using common synonyms and related terms
-            semantic_groups = {
-                'button': ['btn', 'click', 'submit', 'action', 'interactive'],
-                'form': ['input', 'field', 'submit', 'entry', 'data'],
-                'error': ['warning', 'alert', 'problem', 'issue', 'failed'],
-                'login': ['signin', 'authentication', 'auth', 'credentials', 'password'],
-                'dashboard': ['overview', 'summary', 'stats', 'metrics', 'analytics'],
-                'search': ['find', 'lookup', 'query', 'filter', 'discover'],
-                'upload': ['import', 'add', 'attach', 'file', 'document'],
-                'settings': ['config', 'preferences', 'options', 'setup', 'configuration']
-            }
+            semantic_groups = SEMANTIC_GROUPS
             
             query_words = query.lower().split()
             text_words = text.lower().split()
@@ -1108,44 +3150,39 @@ class VisualMemorySearch:
         
         return semantic_context
     
-    def _apply_semantic_boost(self, query: str, semantic_context: Dict, base_similarities: np.ndarray) -> np.ndarray:
-        """Apply semantic boost based on query context and image metadata."""
-        boosted = base_similarities.copy()
-        
-        for i, data in enumerate(self.screenshots_data):
-            boost_factor = 1.0
-            
-            # Boost for category matches
-            if semantic_context['categories']:
-                image_tags = self._extract_semantic_tags(data['visual_description'])
-                category_matches = sum(1 for cat in semantic_context['categories'] if cat in image_tags)
-                if category_matches > 0:
-                    boost_factor *= (1.0 + category_matches * 0.3)
-            
-            # Boost for element matches
-            if semantic_context['elements']:
-                image_elements = self._extract_ui_elements_from_description(data['visual_description'])
-                element_matches = sum(1 for elem in semantic_context['elements'] if elem in image_elements)
-                if element_matches > 0:
-                    boost_factor *= (1.0 + element_matches * 0.4)
-            
-            # Boost for attribute matches
-            if semantic_context['attributes']:
-                for attr in semantic_context['attributes']:
-                    attr_type, attr_value = attr.split(':', 1)
-                    if attr_type == 'colors' and attr_value in data['visual_description'].lower():
-                        boost_factor *= 1.5
-                    elif attr_type == 'styles' and attr_value in data['visual_description'].lower():
-                        boost_factor *= 1.3
-            
-            # Boost for intent alignment
-            if semantic_context['intent']:
-                if 'find' in semantic_context['intent'] and 'button' in query.lower():
-                    # If looking for buttons, boost images with button descriptions
-                    if 'button' in data['visual_description'].lower():
-                        boost_factor *= 1.4
-            
-            boosted[i] *= boost_factor
+    def _apply_semantic_boost(self, query: str, semantic_context: Dict, base_similarities: np.ndarray,
+                              rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Apply semantic boost based on query context and index-time image feature flags (for rows, if given)."""
+        boosted = np.array(base_similarities, dtype=np.float64)
+        boost_factor = np.ones(len(boosted), dtype=np.float64)
+        
+        # Boost for category matches
+        if semantic_context['categories']:
+            category_matches = sum(
+                self._feature(f"tag:{cat}", rows).astype(np.float64)
+                for cat in semantic_context['categories'] if f"tag:{cat}" in FEATURE_INDEX
+            )
+            boost_factor *= 1.0 + category_matches * 0.3
+        
+        # Boost for element matches
+        if semantic_context['elements']:
+            element_matches = sum(self._feature(f"desc:{elem}", rows).astype(np.float64) for elem in semantic_context['elements'])
+            boost_factor *= 1.0 + element_matches * 0.4
+        
+        # Boost for attribute matches
+        for attr in semantic_context['attributes']:
+            attr_type, attr_value = attr.split(':', 1)
+            if attr_type == 'colors':
+                boost_factor *= np.where(self._feature(f"desc:{attr_value}", rows), 1.5, 1.0)
+            elif attr_type == 'styles':
+                boost_factor *= np.where(self._feature(f"desc:{attr_value}", rows), 1.3, 1.0)
+        
+        # Boost for intent alignment
+        if 'find' in semantic_context['intent'] and 'button' in query.lower():
+            # If looking for buttons, boost images with button descriptions
+            boost_factor *= np.where(self._feature('desc:button', rows), 1.4, 1.0)
+        
+        boosted *= boost_factor
         
         # Normalize and ensure reasonable range
         if np.max(boosted) > 0:
@@ -1199,15 +3236,31 @@ class VisualMemorySearch:
         return content_types
     
     def add_screenshot(self, file_path: str) -> bool:
-        """Add a new screenshot to the index."""
+        """Add a new screenshot to the index, encoding and persisting only the new entry."""
         try:
-            screenshot_data = self._process_screenshot(Path(file_path))
+            file_path = Path(file_path)
+            screenshot_data = self._cached_screenshot_record(file_path, FeatureCache.hash_file(file_path))
+            if screenshot_data is None:
+                screenshot_data = self._process_screenshot(file_path)
+                if screenshot_data:
+                    self._remember_features(screenshot_data)
             if screenshot_data:
+                in_sync = (0 if self.index is None else len(self.index)) == len(self.screenshots_data)
                 self.screenshots_data.append(screenshot_data)
-                # Clean up data before building index
-                self._cleanup_screenshot_data()
-                self._build_search_index()
-                self._save_index()
+                # Clean up only the new record before indexing it
+                self._cleanup_screenshot_data([screenshot_data])
+                
+                # Encodes just the missing row and appends it to the matrix and ANN index
+                self._ensure_embeddings()
+                self._ensure_features()
+                self._ensure_ocr_index()
+                
+                base_files_exist = self.index_file.exists() and self.embeddings_file.exists()
+                if not (in_sync and base_files_exist) or self._journal_count >= JOURNAL_MAX_ENTRIES:
+                    self._save_index()
+                else:
+                    self._append_to_journal(screenshot_data, self.index.row(len(self.screenshots_data) - 1))
+                
                 logger.info(f"Added screenshot: {file_path}")
                 return True
             return False
@@ -1215,6 +3268,68 @@ class VisualMemorySearch:
             logger.error(f"Failed to add screenshot {file_path}: {e}")
             return False
     
+    def _append_to_journal(self, screenshot_data: Dict, embedding: np.ndarray):
+        """Append one record and its embedding to the index journal instead of rewriting the index."""
+        entry = {
+            # Row the record occupies, so replay can skip rows a later full save already covers
+            "position": len(self.screenshots_data) - 1,
+            "record": screenshot_data,
+            "embedding": np.asarray(embedding, dtype=np.float32).tolist()
+        }
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self._journal_count += 1
+        self._refresh_index_version()
+    
+    def _refresh_index_version(self):
+        """Derive the index version from the on-disk index files and drop validations cached for older versions."""
+        parts = [str(len(self.screenshots_data))]
+        for path in (self.index_file, self.embeddings_file, self.journal_file):
+            if path.exists():
+                stat = path.stat()
+                parts.append(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}")
+        
+        self.index_version = hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:16]
+        self.validation_cache.invalidate(self.index_version)
+    
+    def _replay_journal(self):
+        """Apply journaled additions on top of the records and embeddings loaded from the full index."""
+        self._journal_count = 0
+        if not self.journal_file.exists():
+            return
+        
+        # A crash between writing the full index and unlinking the journal leaves entries the index already holds
+        base_count = len(self.screenshots_data)
+        skipped = 0
+        records = []
+        embeddings = []
+        with open(self.journal_file, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final write; everything before it is still valid
+                    logger.warning(f"Ignoring unreadable journal line {line_number}")
+                    continue
+                if entry.get("position", base_count) < base_count:
+                    skipped += 1
+                    continue
+                records.append(entry["record"])
+                embeddings.append(entry["embedding"])
+        
+        if records:
+            self.screenshots_data.extend(records)
+            new_rows = self._normalize_rows(embeddings)
+            if self.index is None:
+                self.index = EmbeddingMatrix(dimension=new_rows.shape[1])
+            self.index.append(new_rows)
+            self._journal_count = len(records)
+            logger.info(f"Replayed {len(records)} journaled screenshots")
+        if skipped:
+            logger.info(f"Skipped {skipped} journaled screenshots already in the saved index")
+    
     def list_screenshots(self) -> List[Dict]:
         """List all indexed screenshots."""
         return [
@@ -1227,20 +3342,49 @@ class VisualMemorySearch:
             for data in self.screenshots_data
         ]
 
-    def _call_openai_with_retry(self, messages, max_retries=3, **kwargs):
+    @staticmethod
+    def _estimate_request_tokens(messages, max_tokens: int = 0) -> int:
+        """Rough token cost of a chat request: prompt text, images and a typical completion capped at max_tokens.
+        
+        Reserving the full max_tokens would stall searches behind a bucket that adjust() refunds a moment later.
+        """
+        text_chars = 0
+        images = 0
+        for message in messages:
+            content = message.get('content')
+            if isinstance(content, str):
+                text_chars += len(content)
+                continue
+            for part in content or []:
+                if part.get('type') == 'image_url':
+                    images += 1
+                else:
+                    text_chars += len(part.get('text', ''))
+        return text_chars // 4 + images * OPENAI_IMAGE_TOKEN_ESTIMATE + min(max_tokens or 0, OPENAI_COMPLETION_TOKEN_ESTIMATE)
+    
+    def _call_openai(self, messages, **kwargs):
+        """Single rate-limited chat completion call."""
+        estimated_tokens = self._estimate_request_tokens(messages, kwargs.get('max_tokens', 0))
+        self.openai_limiter.acquire(estimated_tokens)
+        response = self.openai_client.chat.completions.create(messages=messages, **kwargs)
+        usage = getattr(response, 'usage', None)
+        if usage is not None and getattr(usage, 'total_tokens', None) is not None:
+            self.openai_limiter.adjust(usage.total_tokens - estimated_tokens)
+        return response
+    
+    def _call_openai_with_retry(self, messages, max_retries=OPENAI_MAX_RETRIES, **kwargs):
         """Call OpenAI API with retry mechanism for better reliability."""
         for attempt in range(max_retries):
             try:
                 logger.info(f"OpenAI API call attempt {attempt + 1}/{max_retries}")
-                response = self.openai_client.chat.completions.create(messages=messages, **kwargs)
+                response = self._call_openai(messages, **kwargs)
                 logger.info(f"OpenAI API call successful on attempt {attempt + 1}")
                 return response
             except Exception as e:
                 logger.warning(f"OpenAI API call attempt {attempt + 1} failed: {e}")
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
+                    wait_time = OPENAI_RETRY_BASE_DELAY * 2 ** attempt  # Exponential backoff: 2s, 4s, 8s
                     logger.info(f"Waiting {wait_time} seconds before retry...")
-                    import time
                     time.sleep(wait_time)
                 else:
                     logger.error(f"All {max_retries} OpenAI API call attempts failed")
@@ -1266,6 +3410,18 @@ class VisualMemorySearch:
                 result['quality_indicators'] = 'Not available'
             return results
         
+        cache_key = ValidationCache.make_key(query, [result['filename'] for result in results], self.index_version)
+        cached_validations = self.validation_cache.get(cache_key)
+        if cached_validations is not None and len(cached_validations) == len(results):
+            logger.info("Using cached OpenAI validation for identical query and results")
+            for result, validation in zip(results, cached_validations):
+                result.update({field: validation.get(field) for field in VALIDATION_FIELDS})
+                # Same weighting as a fresh validation, over this search's confidence score
+                openai_score = result['openai_score']
+                result['final_score'] = (result['confidence_score'] * 0.25 + openai_score * 0.75
+                                         if openai_score is not None else result['confidence_score'])
+            return results
+        
         try:
             logger.info("Validating results with OpenAI for maximum accuracy and comprehensive analysis...")
             
@@ -1366,8 +3522,7 @@ class VisualMemorySearch:
                 top_p=0.99,       # Maximum focus and precision
                 frequency_penalty=0.3,  # Enhanced to reduce repetition and improve variety
                 presence_penalty=0.3,   # Enhanced to encourage comprehensive coverage
-                response_format={"type": "text"},  # Ensure consistent text output
-                presence_penalty_scale=0.1  # Fine-tune presence penalty for better results
+                response_format={"type": "text"}  # Ensure consistent text output
             )
             
             if response is None:
@@ -1462,6 +3617,13 @@ class VisualMemorySearch:
                         
                         logger.info(f"Generated fallback scores for result {i}: {result['filename']} - OpenAI: {openai_score:.3f}, Final: {final_score:.3f}")
                 
+                # Only successfully parsed validations are cached; API and parse failures are retried next time
+                self.validation_cache.put(
+                    cache_key,
+                    self.index_version,
+                    [{field: result.get(field) for field in VALIDATION_FIELDS} for result in results]
+                )
+                
             except json.JSONDecodeError as e:
                 logger.warning(f"Failed to parse OpenAI response: {e}")
                 logger.warning(f"Raw response: {response.choices[0].message.content}")
@@ -1513,62 +3675,24 @@ class VisualMemorySearch:
             
             return results
 
-    def _detect_blue_buttons_enhanced(self, file_path: Path) -> Dict:
+    def _detect_blue_buttons_enhanced(self, frame: ImageFrame) -> Dict:
         """Enhanced blue button detection using multiple techniques."""
+        file_path = frame.file_path
         try:
-            # Read image
-            image = cv2.imread(str(file_path))
-            if image is None:
-                return {'detected': False, 'count': 0, 'details': 'Failed to read image'}
-            
-            # Convert to different color spaces
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Multiple blue detection ranges for better accuracy
-            blue_ranges = [
-                # Standard blue ranges
-                ([100, 80, 80], [130, 255, 255]),      # Standard blue
-                ([110, 70, 70], [140, 255, 255]),      # Lighter blue
-                ([90, 90, 90], [120, 255, 255]),       # Darker blue
-                ([100, 60, 60], [130, 255, 200]),      # Desaturated blue
-                # Extended ranges for better coverage
-                ([95, 50, 50], [135, 255, 255]),       # Wider blue range
-                ([105, 40, 40], [125, 255, 180]),      # Lower saturation threshold
-            ]
-            
-            blue_pixels_total = 0
-            total_pixels = hsv.shape[0] * hsv.shape[1]
-            
-            # Check all blue ranges
-            for lower, upper in blue_ranges:
-                lower = np.array(lower)
-                upper = np.array(upper)
-                mask = cv2.inRange(hsv, lower, upper)
-                blue_pixels = cv2.countNonZero(mask)
-                blue_pixels_total += blue_pixels
-            
-            blue_percentage = (blue_pixels_total / total_pixels) * 100
+            # Union of the blue ranges from the analysis frame's quantized HSV histogram
+            analysis = self._analysis_frame(frame)
+            blue_percentage = COLOR_QUANTIZER.percentage(analysis.color_histogram, 'blue')
             
-            # Enhanced button detection
-            buttons = self._detect_buttons_enhanced(image)
+            # Enhanced button detection (bboxes in original coordinates, ROI blue measured on the analysis frame)
+            buttons = self._detect_buttons_enhanced(analysis)
             blue_buttons = []
             
             # Check each detected button for blue content
             for button in buttons:
-                x, y, w, h = button['bbox']
-                roi = hsv[y:y+h, x:x+w]
-                
-                # Check if ROI contains significant blue
-                blue_mask = cv2.inRange(roi, np.array([100, 60, 60]), np.array([130, 255, 255]))
-                roi_blue_pixels = cv2.countNonZero(blue_mask)
-                roi_pixels = roi.shape[0] * roi.shape[1]
-                roi_blue_percentage = (roi_blue_pixels / roi_pixels) * 100
-                
-                if roi_blue_percentage > 15:  # 15% blue threshold for button
+                if button['blue_percentage'] > 15:  # 15% blue threshold for button
                     blue_buttons.append({
                         'bbox': button['bbox'],
-                        'blue_percentage': roi_blue_percentage,
+                        'blue_percentage': button['blue_percentage'],
                         'confidence': button['confidence']
                     })
             
@@ -1599,83 +3723,59 @@ class VisualMemorySearch:
                 'details': str(details),
                 'blue_percentage': float(blue_percentage),
                 'total_buttons': int(len(buttons)),
-                'blue_buttons': serializable_blue_buttons
+                'blue_buttons': serializable_blue_buttons,
+                'color_histogram': COLOR_QUANTIZER.to_sparse(analysis.color_histogram)
             }
             
         except Exception as e:
             logger.error(f"Enhanced blue button detection failed for {file_path}: {e}")
             return {'detected': False, 'count': 0, 'details': f'Detection failed: {e}'}
     
-    def _detect_buttons_enhanced(self, image: np.ndarray) -> List[Dict]:
-        """Enhanced button detection with better accuracy."""
+    def _detect_buttons_enhanced(self, frame: ImageFrame) -> List[Dict]:
+        """Enhanced button detection with better accuracy, over the shared UI contour set of an analysis frame.
+        
+        Bounding boxes and areas are mapped back to original screenshot coordinates.
+        """
         try:
-            buttons = []
+            contour_set = frame.ui_contours
+            candidates = contour_set.button_candidates()
             
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # Reasonable button proportions
+            aspect_ratios = contour_set.aspect_ratios[candidates]
+            candidates = candidates[(aspect_ratios >= 0.5) & (aspect_ratios <= 4.0)]
             
-            # Multiple edge detection methods
-            edges1 = cv2.Canny(gray, 30, 100)
-            edges2 = cv2.Canny(gray, 50, 150)
-            edges3 = cv2.Canny(gray, 20, 80)
+            # Confidence from shape regularity: 0.785 is the circularity of an ideal rectangle
+            areas = contour_set.areas[candidates]
+            perimeters = contour_set.perimeters[candidates]
+            circularity = 4 * np.pi * areas / np.maximum(perimeters * perimeters, 1e-12)
+            confidence = np.where(perimeters > 0, 1.0 - np.abs(circularity - 0.785), 0.5)
             
-            # Combine edge detections
-            edges = cv2.bitwise_or(edges1, cv2.bitwise_or(edges2, edges3))
-            
-            # Find contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                # Approximate contour to polygon
-                epsilon = 0.02 * cv2.arcLength(contour, True)
-                approx = cv2.approxPolyDP(contour, epsilon, True)
-                
-                # Check if it's roughly rectangular (4-6 points)
-                if len(approx) >= 4 and len(approx) <= 6:
-                    # Get bounding rectangle
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # Check if it's button-sized
-                    if 30 <= w <= 400 and 20 <= h <= 120:
-                        # Check if it's not just the image border
-                        img_h, img_w = image.shape[:2]
-                        if x > 5 and y > 5 and x + w < img_w - 5 and y + h < img_h - 5:
-                            
-                            # Calculate confidence based on shape regularity
-                            area = cv2.contourArea(contour)
-                            perimeter = cv2.arcLength(contour, True)
-                            if perimeter > 0:
-                                circularity = 4 * np.pi * area / (perimeter * perimeter)
-                                confidence = 1.0 - abs(circularity - 0.785)  # 0.785 is ideal rectangle
-                            else:
-                                confidence = 0.5
-                            
-                            # Check aspect ratio
-                            aspect_ratio = w / h
-                            if 0.5 <= aspect_ratio <= 4.0:  # Reasonable button proportions
-                                buttons.append({
-                                    'bbox': (int(x), int(y), int(w), int(h)),  # Convert to Python int
-                                    'confidence': float(confidence),  # Convert to Python float
-                                    'area': float(area),  # Convert to Python float
-                                    'aspect_ratio': float(aspect_ratio)  # Convert to Python float
-                                })
-            
-            # Sort by confidence
-            buttons.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            # Limit to top buttons
-            return buttons[:10]
+            # Top buttons by confidence
+            buttons = []
+            for i in np.argsort(-confidence, kind='stable')[:MAX_DETECTED_BUTTONS]:
+                x, y, w, h = (int(v) for v in contour_set.bboxes[candidates[i]])
+                buttons.append({
+                    'bbox': tuple(round(v / frame.scale) for v in (x, y, w, h)),
+                    'confidence': float(confidence[i]),
+                    'area': float(areas[i] / frame.scale ** 2),
+                    'aspect_ratio': float(contour_set.aspect_ratios[candidates[i]]),
+                    'blue_percentage': COLOR_QUANTIZER.region_percentage(frame.color_bins[y:y+h, x:x+w], 'button_blue')
+                })
+            return buttons
             
         except Exception as e:
             logger.error(f"Enhanced button detection failed: {e}")
             return []
 
-    def _cleanup_screenshot_data(self):
+    def _cleanup_screenshot_data(self, records: Optional[List[Dict]] = None):
         """Clean up screenshot data to ensure all values are JSON serializable."""
         logger.info("Cleaning up screenshot data for JSON serialization...")
         cleaned_count = 0
         
-        for i, data in enumerate(self.screenshots_data):
+        if records is None:
+            records = self.screenshots_data
+        
+        for i, data in enumerate(records):
             for key, value in list(data.items()):
                 try:
                     # Test JSON serialization
@@ -1714,9 +3814,23 @@ def main():
     parser = argparse.ArgumentParser(description="Visual Memory Search - Search screenshots using natural language")
     parser.add_argument("screenshot_dir", help="Directory containing screenshots")
     parser.add_argument("--query", "-q", help="Search query")
+    parser.add_argument("--queries-file", help="Run every query in a file (one per line) as one batch and print the results as JSON")
     parser.add_argument("--add", "-a", help="Add a new screenshot to index")
     parser.add_argument("--list", "-l", action="store_true", help="List all indexed screenshots")
     parser.add_argument("--rebuild", "-r", action="store_true", help="Rebuild the search index")
+    parser.add_argument("--ann", action="store_true", help="Use the approximate nearest-neighbour index for search")
+    parser.add_argument("--candidate-pool", type=int, default=0, help=f"Two-stage retrieval: boost only this many top dense matches, e.g. {CANDIDATE_POOL_SIZE} (default: 0, boost every screenshot)")
+    parser.add_argument("--ann-index", choices=ANN_INDEX_TYPES, default='flat', help="ANN index variant (default: flat)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Worker processes for index building (0 = all cores, default: 1)")
+    parser.add_argument("--openai-concurrency", type=int, default=OPENAI_MAX_IN_FLIGHT, help=f"OpenAI description requests in flight while indexing (default: {OPENAI_MAX_IN_FLIGHT})")
+    parser.add_argument("--openai-rpm", type=int, help=f"OpenAI requests per minute limit, 0 = unlimited (default: OPENAI_RPM env var or {OPENAI_REQUESTS_PER_MINUTE})")
+    parser.add_argument("--openai-tpm", type=int, help=f"OpenAI tokens per minute limit, 0 = unlimited (default: OPENAI_TPM env var or {OPENAI_TOKENS_PER_MINUTE})")
+    parser.add_argument("--llm-backend", choices=LLM_BACKENDS, help="Chat-completions backend (default: LLM_BACKEND env var or openai)")
+    parser.add_argument("--llm-base-url", help="OpenAI-compatible endpoint, e.g. http://127.0.0.1:8089/v1 for mock_llm_server.py")
+    parser.add_argument("--ocr-mode", choices=OCR_MODES, help="OCR mode stored with the index: full, or tiled bands in parallel for large screenshots (default: keep existing, full for new indexes)")
+    parser.add_argument("--analysis-scale", type=float, help="Downscale factor in (0, 1] for the OpenCV detectors, stored with the index (default: keep existing, 1.0 for new indexes)")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage search timings after each query")
+    parser.add_argument("--embedding-dtype", choices=EMBEDDING_DTYPES, help="On-disk embedding precision (default: keep existing, float32 for new indexes)")
     
     args = parser.parse_args()
     
@@ -1727,7 +3841,12 @@ def main():
     
     try:
         # Initialize search engine
-        search_engine = VisualMemorySearch(args.screenshot_dir)
+        search_engine = VisualMemorySearch(args.screenshot_dir, ann_index_type=args.ann_index, ingest_workers=args.workers,
+                                           embedding_dtype=args.embedding_dtype, enable_openai=not args.list,
+                                           openai_concurrency=args.openai_concurrency, openai_rpm=args.openai_rpm,
+                                           openai_tpm=args.openai_tpm, llm_backend=args.llm_backend,
+                                           llm_base_url=args.llm_base_url, ocr_mode=args.ocr_mode,
+                                           analysis_scale=args.analysis_scale, candidate_pool=args.candidate_pool)
         
         # Handle different commands
         if args.add:
@@ -1751,11 +3870,25 @@ def main():
             else:
                 print("No screenshots indexed yet.")
         
+        elif args.queries_file:
+            with open(args.queries_file, 'r') as f:
+                queries = [line.strip() for line in f if line.strip()]
+            all_results = search_engine.search_many(queries, top_k=5, ann=args.ann)
+            report = [{'query': query, 'results': [{'rank': result.get('rank', i), 'filename': result['filename'],
+                                                     'score': result.get('final_score', result['confidence_score'])}
+                                                    for i, result in enumerate(results, 1)]}
+                      for query, results in zip(queries, all_results)]
+            print(json.dumps(report, indent=2))
+            if args.profile:
+                print(f"⏱️  Search profile:\n{search_engine.profiler.format_table()}", file=sys.stderr)
+        
         elif args.query:
             print(f"Searching for: '{args.query}'")
             print("-" * 50)
             
-            results = search_engine.search(args.query, top_k=5)  # Ensure top 5 results
+            results = search_engine.search(args.query, top_k=5, ann=args.ann)  # Ensure top 5 results
+            if args.profile:
+                print(f"⏱️  Search profile:\n{search_engine.profiler.format_table()}\n")
             
             if results:
                 print(f"Found {len(results)} top results:")
@@ -1803,6 +3936,9 @@ def main():
                 search_engine.index_file.unlink()
             if search_engine.embeddings_file.exists():
                 search_engine.embeddings_file.unlink()
+            search_engine._remove_ann_files()
+            if search_engine.journal_file.exists():
+                search_engine.journal_file.unlink()
             
             # Recreate index
             search_engine._create_index()
@@ -1847,12 +3983,17 @@ def main():
                             search_engine.index_file.unlink()
                         if search_engine.embeddings_file.exists():
                             search_engine.embeddings_file.unlink()
+                        search_engine._remove_ann_files()
+                        if search_engine.journal_file.exists():
+                            search_engine.journal_file.unlink()
                         search_engine._create_index()
                         print("✅ Index rebuilt!")
                     elif user_input.strip():
                         # Treat as search query
                         print(f"\n🔍 Searching for: '{user_input}'")
-                        results = search_engine.search(user_input, top_k=5)  # Ensure top 5 results
+                        results = search_engine.search(user_input, top_k=5, ann=args.ann)  # Ensure top 5 results
+                        if args.profile:
+                            print(f"\n⏱️  Search profile (all queries this session):\n{search_engine.profiler.format_table()}")
                         
                         if results:
                             print(f"\n📊 Found {len(results)} top results:")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Mock LLM Server
+A local stand-in for the OpenAI chat-completions API, for offline load testing of the
+description, validation and scoring calls with configurable latency, jitter and errors.
+
+Run the server and point the app at it:
+    python mock_llm_server.py --port 8089 --latency-ms 800 --jitter-ms 300
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 python main.py test_screenshots --rebuild
+
+Or use it in-process without HTTP with LLM_BACKEND=mock.
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DESCRIPTION_COLORS = ['blue', 'white', 'dark', 'gray', 'green', 'red', 'purple', 'orange']
+DESCRIPTION_ELEMENTS = ['button', 'form', 'input field', 'navigation menu', 'sidebar', 'header', 'modal dialog',
+                        'data table', 'chart', 'search bar', 'card grid', 'login form']
+DESCRIPTION_CONTEXTS = ['dashboard', 'login page', 'settings screen', 'e-commerce product page', 'mobile app',
+                        'social media feed', 'analytics report', 'error page']
+
+class MockCompletionBuilder:
+    """Builds deterministic chat-completion payloads; the same request always gets the same content."""
+
+    def __init__(self, model_prefix: str = "mock-"):
+        self.model_prefix = model_prefix
+
+    @staticmethod
+    def _seed(*parts) -> int:
+        digest = hashlib.sha256("\x00".join(str(p) for p in parts).encode('utf-8')).hexdigest()
+        return int(digest[:16], 16)
+
+    @staticmethod
+    def _split_messages(messages):
+        """Concatenated text of all messages and the image payloads they carry."""
+        texts = []
+        images = []
+        for message in messages:
+            content = message.get('content')
+            if isinstance(content, str):
+                texts.append(content)
+                continue
+            for part in content or []:
+                if part.get('type') == 'image_url':
+                    images.append(part.get('image_url', {}).get('url', ''))
+                else:
+                    texts.append(part.get('text', ''))
+        return "\n".join(texts), images
+
+    def _describe_image(self, image_url: str) -> str:
+        rng = random.Random(self._seed(image_url))
+        context = rng.choice(DESCRIPTION_CONTEXTS)
+        color = rng.choice(DESCRIPTION_COLORS)
+        elements = rng.sample(DESCRIPTION_ELEMENTS, 3)
+        return (f"**UI Elements & Interactive Components:** A {context} with a {color} {elements[0]}, "
+                f"a {elements[1]} and a {elements[2]}.\n"
+                f"**Visual Design & Layout:** {color.capitalize()} color scheme with a modern, clean layout.\n"
+                f"**Content & Functionality:** Typical {context} workflow; web app interface.")
+
+    def _validate(self, text: str) -> str:
+        """Answer the result-validation prompt with one entry per listed result."""
+        query_match = re.search(r'against the query "([^"]*)"', text)
+        query = query_match.group(1) if query_match else ""
+        entries = re.findall(r"\(Index: (\d+)\):\s*- Filename: (.*?)\n.*?- Base Score: ([0-9.]+)", text, re.S)
+        results = []
+        for index, filename, base_score in entries:
+            rng = random.Random(self._seed(query, filename))
+            score = min(1.0, max(0.0, float(base_score) + rng.uniform(-0.1, 0.1)))
+            results.append({
+                "index": int(index),
+                "relevance_score": round(score, 3),
+                "explanation": f"Mock assessment of {filename.strip()} for '{query}'",
+                "semantic_tags": rng.sample(DESCRIPTION_ELEMENTS, 2),
+                "confidence_level": rng.choice(['very_high', 'high', 'medium']),
+                "visual_match_details": "Mock visual match details",
+                "content_alignment": "Mock content alignment",
+                "quality_indicators": "Mock quality indicators"
+            })
+        return json.dumps({"results": results})
+
+    @staticmethod
+    def _score(text: str) -> str:
+        """Answer a 0-1 relevance question with the query's word overlap against the supplied context."""
+        query_match = re.search(r"Query: (.*)", text)
+        query_words = set(re.findall(r"[a-z0-9]+", (query_match.group(1) if query_match else "").lower()))
+        context_words = set(re.findall(r"[a-z0-9]+", text.lower()))
+        if not query_words:
+            return "0.0"
+        return f"{len(query_words & context_words) / len(query_words):.2f}"
+
+    def build(self, request: dict) -> dict:
+        messages = request.get('messages', [])
+        text, images = self._split_messages(messages)
+
+        if images:
+            content = self._describe_image(images[0])
+        elif 'RESULTS TO EVALUATE' in text:
+            content = self._validate(text)
+        elif 'number between 0 and 1' in text:
+            content = self._score(text)
+        else:
+            content = "Hello! This is the mock LLM server."
+
+        prompt_tokens = len(text) // 4 + 85 * len(images)
+        completion_tokens = max(1, len(content) // 4)
+        max_tokens = request.get('max_tokens')
+        if max_tokens:
+            completion_tokens = min(completion_tokens, max_tokens)
+        return {
+            "id": f"chatcmpl-mock-{self._seed(text, images) % 10**12}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": f"{self.model_prefix}{request.get('model', 'model')}",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+class LatencyModel:
+    """Per-request delay of latency +/- uniform jitter, plus an optional error rate; seeded for reproducibility."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self):
+        """(delay in seconds, whether this request fails)."""
+        with self._lock:
+            delay_ms = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fails = self._rng.random() < self.error_rate
+        return max(0.0, delay_ms) / 1000.0, fails
+
+class MockChatClient:
+    """In-process client with the OpenAI SDK surface used by the app: chat.completions.create(...)."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.builder = MockCompletionBuilder()
+        self.latency = LatencyModel(latency_ms, jitter_ms, error_rate, seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, **kwargs):
+        delay, fails = self.latency.next()
+        time.sleep(delay)
+        if fails:
+            raise RuntimeError("Mock LLM error: simulated server error")
+        payload = self.builder.build(dict(kwargs, messages=messages))
+        return SimpleNamespace(
+            id=payload['id'],
+            model=payload['model'],
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(**payload['choices'][0]['message']))],
+            usage=SimpleNamespace(**payload['usage'])
+        )
+
+class MockLLMRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /v1/chat/completions and GET /v1/models."""
+
+    builder = MockCompletionBuilder()
+    latency = LatencyModel()
+    quiet = False
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-gpt-4o", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": {"message": f"Invalid JSON body: {e}", "type": "invalid_request_error"}})
+            return
+
+        delay, fails = self.latency.next()
+        time.sleep(delay)
+        if fails:
+            self._send_json(500, {"error": {"message": "Simulated server error", "type": "server_error"}})
+            return
+        self._send_json(200, self.builder.build(request))
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+def create_server(host: str = "127.0.0.1", port: int = 8089, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                  error_rate: float = 0.0, seed: int = 0, quiet: bool = False) -> ThreadingHTTPServer:
+    """Threaded server (one thread per request, so concurrent clients overlap their latency)."""
+    handler = type("ConfiguredMockLLMRequestHandler", (MockLLMRequestHandler,), {
+        "latency": LatencyModel(latency_ms, jitter_ms, error_rate, seed),
+        "quiet": quiet
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat-completions API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8089, help="Port (default: 8089)")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean response latency in ms (default: 500)")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Uniform +/- jitter in ms (default: 200)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error sampling (default: 0)")
+    parser.add_argument("--quiet", action="store_true", help="Do not log each request")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed, args.quiet)
+    print(f"🧪 Mock LLM server on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, error rate {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Mock LLM server stopped")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
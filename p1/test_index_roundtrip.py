@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Index Round-Trip Test
+Checks that a saved index loads back with the same records and search results, that journaled
+additions are replayed, and that a crash between the index save and the journal cleanup does
+not duplicate records. Uses the benchmark's synthetic corpus and hashing encoder, so no models,
+OCR or OpenAI are needed.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import VisualMemorySearch, ColumnarRecord
+from benchmark import SyntheticEmbeddingModel, synthetic_records
+from generate_test_dataset import TEST_QUERIES
+
+BASE_ENTRIES = 200
+JOURNALED_ENTRIES = 20
+
+def open_engine(corpus_dir: Path) -> VisualMemorySearch:
+    """Load (or create) the index in corpus_dir with the synthetic encoder."""
+    engine = VisualMemorySearch(str(corpus_dir), query_cache_size=0, enable_openai=False)
+    engine.embedding_model = SyntheticEmbeddingModel()
+    return engine
+
+def journal_record(engine: VisualMemorySearch, record: dict):
+    """Index one record the way add_screenshot does when the saved index is in sync."""
+    engine.screenshots_data.append(record)
+    engine._ensure_embeddings()
+    engine._ensure_features()
+    engine._ensure_ocr_index()
+    engine._append_to_journal(record, engine.index.row(len(engine.screenshots_data) - 1))
+
+def search_all(engine: VisualMemorySearch) -> list:
+    return [engine.search(query, top_k=5) for query in TEST_QUERIES]
+
+def same_results(expected: list, actual: list) -> bool:
+    """Same files in the same order per query, with matching scores."""
+    for before, after in zip(expected, actual):
+        if [r['filename'] for r in before] != [r['filename'] for r in after]:
+            return False
+        if not np.allclose([r['confidence_score'] for r in before], [r['confidence_score'] for r in after], atol=1e-5):
+            return False
+    return len(expected) == len(actual)
+
+def plain(record) -> dict:
+    """Record as a dict with tuples as lists, for comparing stored and original values."""
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in dict(record).items()}
+
+def check(label: str, passed: bool) -> bool:
+    print(f"{'✅' if passed else '❌'} {label}")
+    return passed
+
+def run_tests(workdir: Path) -> bool:
+    records = synthetic_records(BASE_ENTRIES + JOURNALED_ENTRIES, workdir)
+    records[0]['content_hash'] = None
+    del records[1]['blue_percentage']
+    base, extra = records[:BASE_ENTRIES], records[BASE_ENTRIES:]
+    results = []
+
+    # Save -> load -> search equality
+    engine = open_engine(workdir)
+    engine.screenshots_data = [dict(record) for record in base]
+    engine._build_search_index()
+    engine._save_index()
+    expected = search_all(engine)
+
+    loaded = open_engine(workdir)
+    results.append(check("Loaded records are memory-mapped columnar records",
+                         all(isinstance(record, ColumnarRecord) for record in loaded.screenshots_data)))
+    results.append(check("Records round-trip through the columnar index",
+                         [plain(r) for r in loaded.screenshots_data] == [plain(r) for r in base]))
+    results.append(check("Missing fields raise KeyError and stored None reads back as None",
+                         'blue_percentage' not in loaded.screenshots_data[1]
+                         and loaded.screenshots_data[1].get('blue_percentage', 'missing') == 'missing'
+                         and 'content_hash' in loaded.screenshots_data[0]
+                         and loaded.screenshots_data[0]['content_hash'] is None))
+    results.append(check("Search results match after save and load", same_results(expected, search_all(loaded))))
+
+    # Journal replay
+    for record in extra:
+        journal_record(loaded, dict(record))
+    expected = search_all(loaded)
+    replayed = open_engine(workdir)
+    results.append(check(f"Journal replays {JOURNALED_ENTRIES} additions",
+                         len(replayed.screenshots_data) == len(records) and len(replayed.index) == len(records)))
+    results.append(check("Search results match after journal replay", same_results(expected, search_all(replayed))))
+
+    # Crash after the full save but before the journal is removed
+    journal_copy = workdir / "journal.bak"
+    shutil.copy(replayed.journal_file, journal_copy)
+    replayed._save_index()
+    shutil.copy(journal_copy, replayed.journal_file)
+    recovered = open_engine(workdir)
+    filenames = [record['filename'] for record in recovered.screenshots_data]
+    results.append(check("Leftover journal after a full save adds no duplicates",
+                         len(filenames) == len(records) and len(set(filenames)) == len(records)
+                         and len(recovered.index) == len(records)))
+    results.append(check("Search results match after crash recovery", same_results(expected, search_all(recovered))))
+
+    return all(results)
+
+def main():
+    """Main test function."""
+    print("🧪 Running Index Round-Trip Tests")
+    print("=" * 50)
+    logging.getLogger().setLevel(logging.WARNING)
+    workdir = Path(tempfile.mkdtemp(prefix="vms_roundtrip_"))
+    try:
+        passed = run_tests(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print()
+    print("🎉 All round-trip checks passed!" if passed else "❌ Some round-trip checks failed")
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ class Settings(BaseSettings):
     # AI/ML settings
     openai_api_key: Optional[str] = Field(default=None, description="OpenAI API key")
     openai_model: str = Field(default="gpt-3.5-turbo", description="OpenAI model name")
+    openai_base_url: Optional[str] = Field(default=None, description="OpenAI-compatible API base URL, e.g. a local mock server")
     embedding_model: str = Field(default="all-MiniLM-L6-v2", description="Text embedding model")
     vision_model: str = Field(default="microsoft/git-base", description="Vision model for feature extraction")
     
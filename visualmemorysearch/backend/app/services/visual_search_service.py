@@ -87,8 +87,8 @@ class VisualSearchService:
                 if api_key:
                     logger.info("Using global OpenAI API key")
             
-            if api_key:
-                self.openai_client = openai.OpenAI(api_key=api_key)
+            self.openai_client = self._create_openai_client(api_key)
+            if self.openai_client:
                 
                 # Test the connection
                 try:
@@ -109,6 +109,15 @@ class VisualSearchService:
             logger.error(f"Failed to setup OpenAI: {e}")
             return False
     
+    def _create_openai_client(self, api_key: Optional[str]) -> Optional[openai.OpenAI]:
+        """Create a chat-completions client, pointed at settings.openai_base_url when configured."""
+        settings = get_settings()
+        if not api_key and settings.openai_base_url:
+            api_key = "local"  # OpenAI-compatible local servers (e.g. p1/mock_llm_server.py) need no real key
+        if not api_key:
+            return None
+        return openai.OpenAI(api_key=api_key, base_url=settings.openai_base_url)
+    
     def _initialize_models(self):
         """Initialize ML models."""
         try:
@@ -402,14 +411,12 @@ class VisualSearchService:
             # Use user-specific key or fall back to global key
             api_key = user_openai_key or get_settings().openai_api_key
             
-            if not api_key:
+            # Create OpenAI client with the appropriate key
+            client = self._create_openai_client(api_key)
+            if client is None:
                 logger.debug("No OpenAI API key available, skipping enhanced search")
                 return 0.0
             
-            # Create OpenAI client with the appropriate key
-            from openai import OpenAI
-            client = OpenAI(api_key=api_key)
-            
             # Create context for OpenAI
             context = f"Query: {query}\n"
             if screenshot_info.text_content:
@@ -417,7 +424,7 @@ class VisualSearchService:
             
             logger.debug(f"Making OpenAI API call for query: {query}")
             response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=get_settings().openai_model,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that evaluates how well a screenshot matches a search query. Return only a number between 0 and 1, where 1 is a perfect match."},
                     {"role": "user", "content": f"{context}\nHow well does this screenshot match the query? Return only a number between 0 and 1."}